@@ -1,15 +1,27 @@
+import atexit
+import mmap
 import os
 import shutil
-import tempfile
-from typing import Optional, Dict, Any
+import io
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
 import re
+import random
 import asyncio
 import uuid
+import secrets
 from datetime import datetime
 from dataclasses import dataclass
+from functools import lru_cache
+from collections import Counter, OrderedDict, deque
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
 import zipfile
+import zlib
+import hashlib
+import itertools
 import signal
 import sys
 import subprocess
@@ -19,26 +31,89 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
     psutil = None
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+# Import COM sekali di module level (bukan per panggilan di dalam fungsi);
+# cek ketersediaan cukup dengan `pythoncom is None`
+if sys.platform == "win32":
+    try:
+        import pythoncom
+        import win32com.client as win32com_client
+    except ImportError:
+        pythoncom = None
+        win32com_client = None
+else:
+    pythoncom = None
+    win32com_client = None
+from concurrent.futures import ProcessPoolExecutor
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from docx2pdf import convert
+import aiofiles
 import httpx
 
+# Direktori log (juga dipakai endpoint /logs/tail)
+LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+
+
+class FastRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler dengan shouldRollover murah.
+
+    Versi stdlib melakukan probe os.path.exists/isfile + seek per emit;
+    di sini cukup posisi stream (mode append = selalu di akhir file).
+    Probe filesystem hanya terjadi saat open/rollover. Hasil format juga
+    di-cache di record supaya emit() tidak memformat ulang pesan yang
+    sudah diukur shouldRollover().
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        cached = getattr(record, "_fast_formatted", None)
+        if cached is None:
+            cached = super().format(record)
+            record._fast_formatted = cached
+        return cached
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.maxBytes <= 0:
+            return 0
+        if self.stream is None:
+            self.stream = self._open()
+        msg = "%s\n" % self.format(record)
+        if self.stream.tell() + len(msg) >= self.maxBytes:
+            return 1
+        return 0
+
+
 # Setup logging untuk file
 def setup_file_logging():
     """Setup file logging tanpa mengubah print statements"""
-    # Buat direktori logs jika belum ada
-    log_dir = os.path.join(os.path.dirname(__file__), "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    
     # Setup formatter
     formatter = logging.Formatter(
         '%(asctime)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
+    # Child process pool konversi (start method spawn me-reimport modul ini):
+    # JANGAN pasang file handler. Child yang ikut memegang file log bersama
+    # membuat os.rename saat rollover parent gagal di Windows (file terbuka
+    # tanpa FILE_SHARE_DELETE) dan mematikan file logging sampai restart.
+    # Child cukup stdout; diagnosa penting dikembalikan ke parent untuk di-log.
+    if os.getenv("CONVERTER_POOL_CHILD") == "1":
+        child_logger = logging.getLogger('converter_file')
+        child_logger.setLevel(logging.INFO)
+        child_logger.handlers.clear()
+        if os.getenv("LOG_TO_STDOUT", "1") == "1":
+            stdout_handler = logging.StreamHandler(sys.stdout)
+            stdout_handler.setLevel(logging.INFO)
+            stdout_handler.setFormatter(formatter)
+            child_logger.addHandler(stdout_handler)
+        else:
+            child_logger.addHandler(logging.NullHandler())
+        return child_logger
+
+    # Buat direktori logs jika belum ada
+    log_dir = LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
+
     # Setup file logger
     file_logger = logging.getLogger('converter_file')
     file_logger.setLevel(logging.INFO)
@@ -47,36 +122,71 @@ def setup_file_logging():
     file_logger.handlers.clear()
     
     # File handler untuk semua logs (dengan rotation)
-    file_handler = RotatingFileHandler(
+    file_handler = FastRotatingFileHandler(
         os.path.join(log_dir, "converter.log"),
         maxBytes=10*1024*1024,  # 10MB per file
-        backupCount=5  # Keep 5 backup files
+        backupCount=5,  # Keep 5 backup files
+        delay=True  # Buka file saat log pertama, bukan saat import
     )
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(formatter)
-    file_logger.addHandler(file_handler)
-    
+
     # Error file handler khusus untuk errors
-    error_handler = RotatingFileHandler(
+    error_handler = FastRotatingFileHandler(
         os.path.join(log_dir, "converter_errors.log"),
         maxBytes=5*1024*1024,  # 5MB per file
-        backupCount=3
+        backupCount=3,
+        delay=True
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
-    file_logger.addHandler(error_handler)
-    
+
+    # Worker hanya enqueue record (tanpa disk I/O); listener thread yang menulis
+    # ke file handler di background
+    log_queue = queue.Queue(-1)
+    file_logger.addHandler(QueueHandler(log_queue))
+
+    handlers = [file_handler, error_handler]
+
+    # Output console juga lewat listener (bukan print() di hot path);
+    # bisa dimatikan dengan LOG_TO_STDOUT=0 misal saat jalan sebagai service
+    if os.getenv("LOG_TO_STDOUT", "1") == "1":
+        stdout_handler = logging.StreamHandler(sys.stdout)
+        stdout_handler.setLevel(logging.INFO)
+        stdout_handler.setFormatter(formatter)
+        handlers.append(stdout_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Simpan listener di logger supaya bisa di-stop/flush saat shutdown
+    file_logger.queue_listener = listener
+    # Jaring pengaman: flush record tersisa juga saat exit di luar jalur
+    # shutdown FastAPI (mis. crash startup, SIGTERM sebelum app jalan)
+    atexit.register(stop_log_listener)
+
     return file_logger
 
+def stop_log_listener():
+    """Stop listener logging sekali saja (idempotent; dipanggil dari
+    shutdown_event dan atexit)."""
+    listener = getattr(file_logger, "queue_listener", None)
+    if listener is not None:
+        file_logger.queue_listener = None
+        listener.stop()
+
+
 # Initialize file logging
 file_logger = setup_file_logging()
 
-# Fungsi helper untuk print + log ke file
+# Cek level DEBUG sekali saja; dipakai untuk melewati konstruksi f-string mahal
+# (dict(resp.headers), slicing response text, dst.) saat DEBUG tidak aktif
+DEBUG_LOG_ENABLED = file_logger.isEnabledFor(logging.DEBUG)
+
+# Fungsi helper untuk log ke console + file (keduanya via queue listener)
 def log_print(message: str, level: str = "INFO"):
-    """Print ke console dan simpan ke file log"""
-    print(message)
-    
-    # Simpan juga ke file
+    """Catat ke console dan file log lewat satu jalur logger (non-blocking)."""
+    # Tidak ada print() di sini: stdout ditangani StreamHandler di listener thread,
+    # jadi hot path cuma enqueue record tanpa memegang lock stdout
     if level == "ERROR":
         file_logger.error(message.replace("ERROR: ", ""))
     elif level == "WARNING":
@@ -104,21 +214,306 @@ def enable_queue_status_log_suppression():
     except Exception as e:
         log_print(f"WARNING: Failed to add access log filter: {e}", "WARNING")
 
-app = FastAPI(title="DOCX to PDF Converter", version="1.0.0")
+# ORJSONResponse: serialisasi JSON C-backed, jauh lebih cepat dari stdlib json
+app = FastAPI(title="DOCX to PDF Converter", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Aktifkan suppression untuk akses log /queue/status
 enable_queue_status_log_suppression()
 
-# Queue untuk menampung request konversi
-conversion_queue = asyncio.Queue()
-queue_status: Dict[str, Dict[str, Any]] = {}
-queue_workers_running = 0
+# Client per target_url: tiap upstream punya pool koneksi sendiri yang sudah
+# ter-establish (TLS/HTTP2), jadi upload berikutnya ke target yang sama tinggal pakai
+TARGET_CLIENTS: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_target_client(target_url: str) -> httpx.AsyncClient:
+    """Ambil (atau buat) client khusus untuk satu target_url."""
+    key = target_url.rstrip("/")
+    client = TARGET_CLIENTS.get(key)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(90.0, connect=15.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+        TARGET_CLIENTS[key] = client
+    return client
+
+
+class TargetBreaker:
+    """Circuit breaker sederhana per target_url.
+
+    Saat target benar-benar down, worker jangan buang 60-90 detik per request
+    menunggu timeout + retry: setelah failure rate di sliding window melewati
+    ambang, upload ke target itu langsung gagal cepat sampai cooldown lewat
+    (lalu half-open: satu percobaan diizinkan lagi).
+    """
+
+    WINDOW_SECONDS = 30.0
+    MIN_SAMPLES = 10
+    FAILURE_THRESHOLD = 0.5
+    COOLDOWN_SECONDS = 30.0
+
+    def __init__(self):
+        self._samples: Dict[str, deque] = {}
+        self._opened_at: Dict[str, float] = {}
+
+    def _prune(self, key: str, now: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque()
+        while samples and (now - samples[0][0]) > self.WINDOW_SECONDS:
+            samples.popleft()
+        return samples
+
+    def record(self, target_url: str, ok: bool):
+        key = target_url.rstrip("/")
+        now = time.monotonic()
+        samples = self._prune(key, now)
+        samples.append((now, ok))
+        if ok:
+            self._opened_at.pop(key, None)
+            return
+        failures = sum(1 for _, sample_ok in samples if not sample_ok)
+        if len(samples) >= self.MIN_SAMPLES and failures / len(samples) > self.FAILURE_THRESHOLD:
+            if key not in self._opened_at:
+                log_print(f"WARNING: Circuit breaker OPEN for target {key} ({failures}/{len(samples)} failures)", "WARNING")
+            self._opened_at[key] = now
+
+    def allow(self, target_url: str) -> bool:
+        key = target_url.rstrip("/")
+        opened_at = self._opened_at.get(key)
+        if opened_at is None:
+            return True
+        if (time.monotonic() - opened_at) < self.COOLDOWN_SECONDS:
+            return False
+        # Half-open: izinkan satu percobaan; record() berikutnya yang menentukan
+        # breaker menutup (sukses) atau buka lagi (gagal)
+        return True
+
+    def state(self) -> Dict[str, str]:
+        now = time.monotonic()
+        out = {}
+        for key, opened_at in self._opened_at.items():
+            out[key] = "open" if (now - opened_at) < self.COOLDOWN_SECONDS else "half-open"
+        return out
+
+
+TARGET_BREAKER = TargetBreaker()
+
 MAX_CONCURRENT_WORKERS = 15  # Increased workers for better throughput
 
+# Pilihan engine konversi: "auto" (LibreOffice dulu, fallback MS Word),
+# "libreoffice" (tanpa fallback), atau "docx2pdf" (langsung MS Word)
+CONVERTER_BACKEND = os.getenv("CONVERTER_BACKEND", "auto").strip().lower()
+
+# Folder penyimpanan lokal; statis dari env, jadi cukup dibuat sekali saat import
+BASE_DIR = os.getenv("DOC_LOCAL_DIR", os.path.join(os.path.dirname(__file__), "document"))
+os.makedirs(BASE_DIR, exist_ok=True)
+
+# Queue untuk menampung request konversi. Bounded: saat pipeline penuh,
+# handler balas 503 (fail fast) alih-alih menumpuk RAM / menggantung koneksi.
+# PriorityQueue: /convert (timeout pendek, latency-sensitive) selalu menyalip
+# /convertDua yang antri, supaya bulk tidak merusak tail latency request kecil.
+# Counter monotonic memecah seri tanpa membandingkan ConversionRequest,
+# sekaligus menjaga FIFO di dalam prioritas yang sama.
+QUEUE_MAX = int(os.getenv("QUEUE_MAX", str(MAX_CONCURRENT_WORKERS * 4)))
+conversion_queue: asyncio.Queue = asyncio.PriorityQueue(maxsize=QUEUE_MAX)
+_QUEUE_SEQ = itertools.count()
+_ENDPOINT_PRIORITY = {"convert": 0, "convertDua": 1}
+
+# Seluruh perbedaan antar tipe endpoint di satu tabel: optimasi jalur upload
+# cukup ditulis sekali dan otomatis berlaku untuk semua tipe
+ENDPOINT_CONFIG = {
+    "convert": {
+        "suffix": "/check/responseBalikConvert",
+        "max_retries": 3,
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+    },
+    "convertDua": {
+        "suffix": "/check/responseBalikConvertDua",
+        "max_retries": 3,
+        "timeout": httpx.Timeout(90.0, connect=15.0),
+    },
+}
+# Kedalaman antrian per prioritas (maintain inkremental untuk /queue/status)
+queued_by_priority: Counter = Counter()
+
+# Pipeline 2 tahap: worker konversi mendorong hasil ke upload_queue sehingga
+# konversi request N+1 overlap dengan upload request N (CPU/COM vs network)
+UPLOAD_WORKERS = 5
+upload_queue = asyncio.Queue(maxsize=2 * UPLOAD_WORKERS)
+# Status tracking dibatasi: entry terlama yang sudah final dibuang saat melebihi batas
+queue_status: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+MAX_STATUS_ENTRIES = 10_000
+# Mapping job batch -> list request_id anaknya (untuk /convertBatch).
+# Dibatasi seperti queue_status: cap + dibuang saat seluruh anaknya sudah
+# ter-evict dari status tracking
+batch_jobs: "OrderedDict[str, List[str]]" = OrderedDict()
+MAX_BATCH_JOBS = 1000
+queue_workers_running = 0
+
+
+def _register_batch_job(job_id: str, children: List[str]):
+    """Simpan peta job batch dengan cap jumlah entry (evict paling lama)."""
+    batch_jobs[job_id] = children
+    while len(batch_jobs) > MAX_BATCH_JOBS:
+        batch_jobs.popitem(last=False)
+
+
+# Counter status + ring request terbaru di-update per transisi,
+# supaya /queue/status tidak perlu scan + sort seluruh dict
+status_counts: Counter = Counter()
+recent_request_ids: deque = deque(maxlen=20)
+
+
+def _register_status(request_id: str):
+    """Catat request baru (status awal: queued)."""
+    status_counts["queued"] += 1
+    recent_request_ids.appendleft(request_id)
+
+
+# Dedup konversi in-flight: key (hash konten + nomor_urut + endpoint + target)
+# -> request_id yang sedang berjalan. Retry/double-click dengan isi sama tidak
+# menjalankan konversi kedua, cukup diarahkan ke request yang sudah ada.
+INFLIGHT_HASHES: Dict[str, str] = {}
+
+
+def _transition_status(request_id: str, new_status: str):
+    """Pindahkan status request dan update counter secara inkremental."""
+    info = queue_status.get(request_id)
+    if info is None:
+        return
+    old_status = info.get("status")
+    if old_status and status_counts[old_status] > 0:
+        status_counts[old_status] -= 1
+    status_counts[new_status] += 1
+    info["status"] = new_status
+
+    # Request final tidak lagi menahan slot dedup
+    if new_status in ("completed", "upload_failed", "error"):
+        dedup_key = info.get("dedup_key")
+        if dedup_key and INFLIGHT_HASHES.get(dedup_key) == request_id:
+            INFLIGHT_HASHES.pop(dedup_key, None)
+
+
+def _drop_status_entry(request_id: str):
+    """Pop satu entry status sekaligus turunkan counter status-nya.
+
+    Tanpa ini counter completed/upload_failed/error berubah makna jadi total
+    seumur hidup setelah eviction pertama, tidak lagi cocok dengan entry
+    yang masih di-track.
+    """
+    info = queue_status.pop(request_id, None)
+    if info is None:
+        return
+    status = info.get("status")
+    if status and status_counts[status] > 0:
+        status_counts[status] -= 1
+
+
+def _evict_old_status():
+    """Buang entry status paling lama yang sudah final agar memori tidak tumbuh tanpa batas."""
+    while len(queue_status) > MAX_STATUS_ENTRIES:
+        oldest_id = next(iter(queue_status))
+        if queue_status[oldest_id]["status"] in ("completed", "upload_failed", "error"):
+            _drop_status_entry(oldest_id)
+        else:
+            break
+
+
+# Entry status final lebih tua dari ini dibuang walau cap belum tercapai
+STATUS_TTL_SECONDS = int(os.getenv("STATUS_TTL_SECONDS", "3600"))
+
+
+async def _evict_stale_status():
+    """Background task: buang entry status final yang sudah melewati TTL.
+
+    Melengkapi cap MAX_STATUS_ENTRIES - pada traffic rendah entry completed
+    tidak perlu menginap berjam-jam hanya karena cap belum tercapai.
+    """
+    while True:
+        await asyncio.sleep(300)
+        try:
+            cutoff = datetime.now()
+            evicted = 0
+            for rid, s in list(queue_status.items()):
+                if s.get("status") not in ("completed", "upload_failed", "error"):
+                    continue
+                t = s.get("completed_at") or s.get("created_at")
+                if t and (cutoff - t).total_seconds() > STATUS_TTL_SECONDS:
+                    _drop_status_entry(rid)
+                    evicted += 1
+            if evicted:
+                log_print(f"INFO: Evicted {evicted} stale status entries (TTL {STATUS_TTL_SECONDS}s)")
+            # Job batch yang seluruh anaknya sudah hilang dari queue_status
+            # berarti selesai sejak lama; buang petanya juga
+            for job_id, child_ids in list(batch_jobs.items()):
+                if all(cid not in queue_status for cid in child_ids):
+                    batch_jobs.pop(job_id, None)
+        except Exception as e:
+            log_print(f"WARNING: Stale status eviction failed: {e}", "WARNING")
+
+
+# Direktori kerja yatim (mis. upload_failed yang file-nya sengaja ditahan untuk
+# inspeksi) dibuang setelah TTL supaya disk tidak bocor tanpa batas
+WORK_DIR_TTL_SECONDS = int(os.getenv("WORK_DIR_TTL_SECONDS", str(STATUS_TTL_SECONDS)))
+
+# Nama yang boleh disapu: work dir per-request (token_hex 16 / uuid lama),
+# outdir batch sekali-pakai, dan file staging upload
+_SWEEPABLE_NAME_RE = re.compile(
+    r"^[0-9a-f]{16}$|^[0-9a-f-]{36}$|^\.batch_[0-9a-f]{32}$|^upload_[0-9a-f]{32}\.docx$"
+)
+
+
+def _sweep_stale_work_dirs() -> int:
+    """Hapus direktori kerja dan file staging yatim yang melewati TTL."""
+    removed = 0
+    cutoff = time.time() - WORK_DIR_TTL_SECONDS
+    try:
+        entries = os.listdir(BASE_DIR)
+    except OSError:
+        return 0
+    for name in entries:
+        if not _SWEEPABLE_NAME_RE.match(name):
+            continue
+        # Jangan sentuh request yang masih berjalan
+        if queue_status.get(name, {}).get("status") in ("queued", "processing", "uploading"):
+            continue
+        path = os.path.join(BASE_DIR, name)
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+async def _evict_stale_work_dirs():
+    """Background task: sapu direktori kerja yatim secara periodik.
+
+    Pasangan _evict_stale_status untuk disk: sejak work dir per-request,
+    upload yang gagal meninggalkan {BASE_DIR}/{request_id}/ berisi DOCX+PDF
+    dan retry ke target yang sama terus mencetak direktori baru.
+    """
+    while True:
+        await asyncio.sleep(300)
+        try:
+            removed = await asyncio.to_thread(_sweep_stale_work_dirs)
+            if removed:
+                log_print(f"INFO: Removed {removed} stale work dirs/staging files (TTL {WORK_DIR_TTL_SECONDS}s)")
+        except Exception as e:
+            log_print(f"WARNING: Stale work dir sweep failed: {e}", "WARNING")
+
+
 @dataclass
 class ConversionRequest:
     request_id: str
-    file_content: bytes
+    docx_path: str  # path file staging hasil streaming upload
     filename: str
     nomor_urut: str
     target_url: str
@@ -126,35 +521,161 @@ class ConversionRequest:
     created_at: datetime
 
 
+# Maksimal item yang di-drain satu worker per wakeup; kecil supaya satu worker
+# tidak memborong antrian dari worker lain saat burst
+BATCH_MAX = 4
+
+
+async def _process_one_conversion(
+    worker_id: int,
+    request: ConversionRequest,
+    prepared: Optional[Tuple[str, str, str]] = None,
+    lo_success: bool = False,
+):
+    """Proses satu request sampai masuk upload_queue (atau error)."""
+    # Update status menjadi processing
+    _transition_status(request.request_id, "processing")
+    queue_status[request.request_id]["started_at"] = datetime.now()
+    queue_status[request.request_id]["worker_id"] = worker_id
+
+    log_print(f"INFO: Worker {worker_id} processing conversion request {request.request_id} for {request.nomor_urut}")
+
+    try:
+        # Tahap konversi saja; upload dikerjakan worker tahap berikutnya
+        converted = await _convert_stage(request, prepared=prepared, lo_success=lo_success)
+
+        _transition_status(request.request_id, "uploading")
+        await upload_queue.put((request, converted))
+
+    except Exception as e:
+        _mark_request_error(request, e)
+        log_print(f"ERROR: Worker {worker_id} failed conversion request {request.request_id}: {e}", "ERROR")
+
+        # Recovery terarah: bunuh hanya proses yang memegang file request ini.
+        # Kalau tidak ada pemegang handle, error-nya bukan "file in use" —
+        # cukup reaper umum berbasis umur (tidak menyentuh konversi lain yang
+        # masih sehat). Scan psutil + kill bisa makan beberapa detik, jadi
+        # semua jalan di thread.
+        try:
+            work_dir = os.path.join(BASE_DIR, request.request_id)
+            killed = await asyncio.to_thread(_kill_procs_holding_work_dir, work_dir)
+            if killed:
+                invalidate_engine_cache()
+            else:
+                await asyncio.to_thread(cleanup_hanging_processes)
+        except Exception as cleanup_error:
+            log_print(f"WARNING: Process cleanup after error failed: {cleanup_error}", "WARNING")
+
+
 async def process_conversion_queue(worker_id: int):
     """Background worker untuk memproses queue konversi dengan multiple worker concurrent"""
     global queue_workers_running
     queue_workers_running += 1
-    
+
     log_print(f"INFO: Conversion queue worker {worker_id} started")
-    
+
     while True:
         try:
-            # Ambil request dari queue (akan menunggu jika queue kosong)
-            request: ConversionRequest = await conversion_queue.get()
-            
-            # Update status menjadi processing
-            queue_status[request.request_id]["status"] = "processing"
-            queue_status[request.request_id]["started_at"] = datetime.now()
-            queue_status[request.request_id]["worker_id"] = worker_id
-            
-            log_print(f"INFO: Worker {worker_id} processing conversion request {request.request_id} for {request.nomor_urut}")
-            
+            # Ambil request dari queue (akan menunggu jika queue kosong),
+            # lalu drain non-blocking sampai BATCH_MAX untuk mengurangi
+            # roundtrip scheduler per item saat antrian penuh
+            _, _, first = await conversion_queue.get()
+            batch = [first]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(conversion_queue.get_nowait()[2])
+                except asyncio.QueueEmpty:
+                    break
+            for r in batch:
+                queued_by_priority[_ENDPOINT_PRIORITY.get(r.endpoint_type, 1)] -= 1
+
+            # Batch >= 2 file + LibreOffice tersedia: satu invocation soffice
+            # untuk semua file (startup LO dibayar sekali per batch). Yang
+            # gagal prep/konversi di sini jatuh ke jalur per-item di bawah.
+            prepared: Dict[str, Tuple[str, str, str]] = {}
+            lo_results: Dict[str, bool] = {}
+            if (
+                len(batch) >= 2
+                and CONVERTER_BACKEND != "docx2pdf"
+                and get_cached_engines()["libreoffice"]
+            ):
+                items = []
+                seen_names = set()
+                for r in batch:
+                    try:
+                        paths = await _prepare_work_files(r)
+                    except Exception:
+                        # Biarkan jalur per-item yang menangani error prep-nya
+                        continue
+                    prepared[r.request_id] = paths
+                    # Basename kembar akan saling timpa di outdir bersama;
+                    # sisakan satu, sisanya lewat jalur per-item
+                    base = os.path.basename(paths[1])
+                    if base in seen_names:
+                        continue
+                    seen_names.add(base)
+                    items.append((r.request_id, paths[1], paths[2]))
+                if len(items) >= 2:
+                    conversion_timeout = int(os.getenv("CONVERSION_TIMEOUT", "90"))
+                    lo_results = await convert_batch_with_libreoffice(items, conversion_timeout)
+
+            await asyncio.gather(
+                *(
+                    _process_one_conversion(
+                        worker_id,
+                        r,
+                        prepared=prepared.get(r.request_id),
+                        lo_success=lo_results.get(r.request_id, False),
+                    )
+                    for r in batch
+                ),
+                return_exceptions=True,
+            )
+
+            # Tandai task selesai di queue dan buang entry status lama
+            _evict_old_status()
+            for _ in batch:
+                conversion_queue.task_done()
+
+            # Yield eksplisit: get() pada queue non-kosong bisa return tanpa
+            # suspend, jadi beri kesempatan handler HTTP (/queue/status) jalan
+            # di antara batch saat burst back-to-back
+            await asyncio.sleep(0)
+
+        except Exception as e:
+            log_print(f"ERROR: Queue worker {worker_id} error: {e}", "ERROR")
+            await asyncio.sleep(1)
+
+
+def _mark_request_error(request: ConversionRequest, exc: Exception):
+    """Tandai request error dan bersihkan file staging yang mungkin tersisa."""
+    _transition_status(request.request_id, "error")
+    queue_status[request.request_id]["error"] = str(exc)
+    queue_status[request.request_id]["completed_at"] = datetime.now()
+
+    try:
+        os.remove(request.docx_path)
+    except OSError:
+        pass
+
+
+async def process_upload_queue(worker_id: int):
+    """Background worker tahap upload: kirim PDF hasil konversi ke target server"""
+    log_print(f"INFO: Upload queue worker {worker_id} started")
+
+    while True:
+        try:
+            request, converted = await upload_queue.get()
+
             try:
-                # Proses konversi
-                result = await process_single_conversion(request)
-                
+                result = await _upload_stage(request, **converted)
+
                 # Cek hasil upload untuk menentukan status final
                 upload_success = False
                 if result and result.get("target_status"):
                     target_status = result["target_status"]
                     target_response = result.get("target_response")
-                    
+
                     # Upload sukses jika status 2xx dan ada upload_data di response
                     if 200 <= target_status < 300:
                         if isinstance(target_response, dict) and "upload_data" in target_response:
@@ -164,67 +685,101 @@ async def process_conversion_queue(worker_id: int):
                             log_print(f"WARNING: Upload status 2xx but no upload_data in response for request {request.request_id}")
                     else:
                         log_print(f"WARNING: Upload failed with status {target_status} for request {request.request_id}")
-                
+
                 # Update status berdasarkan hasil upload
                 if upload_success:
-                    queue_status[request.request_id]["status"] = "completed"
-                    log_print(f"INFO: Worker {worker_id} completed conversion and upload for request {request.request_id}")
+                    _transition_status(request.request_id, "completed")
+                    log_print(f"INFO: Upload worker {worker_id} completed request {request.request_id}")
                 else:
-                    queue_status[request.request_id]["status"] = "upload_failed"
-                    log_print(f"WARNING: Worker {worker_id} conversion success but upload failed for request {request.request_id}")
-                
+                    _transition_status(request.request_id, "upload_failed")
+                    log_print(f"WARNING: Upload worker {worker_id} conversion success but upload failed for request {request.request_id}", "WARNING")
+
                 queue_status[request.request_id]["completed_at"] = datetime.now()
                 queue_status[request.request_id]["result"] = result
                 queue_status[request.request_id]["upload_success"] = upload_success
-                
+
             except Exception as e:
-                # Update status menjadi error
-                queue_status[request.request_id]["status"] = "error"
-                queue_status[request.request_id]["error"] = str(e)
-                queue_status[request.request_id]["completed_at"] = datetime.now()
-                
-                log_print(f"ERROR: Worker {worker_id} failed conversion request {request.request_id}: {e}", "ERROR")
-                
-                # Clean up hanging processes after failures
-                try:
-                    cleanup_hanging_processes()
-                except Exception as cleanup_error:
-                    log_print(f"WARNING: Process cleanup after error failed: {cleanup_error}", "WARNING")
-            
-            # Tandai task selesai di queue
-            conversion_queue.task_done()
-            
+                _mark_request_error(request, e)
+                log_print(f"ERROR: Upload worker {worker_id} failed request {request.request_id}: {e}", "ERROR")
+                # Error tahap upload bersifat terminal: buang direktori kerja
+                # request ini, jangan tunggu sweeper TTL
+                await asyncio.to_thread(shutil.rmtree, converted["work_dir"], ignore_errors=True)
+
+            _evict_old_status()
+            upload_queue.task_done()
+
         except Exception as e:
-            log_print(f"ERROR: Queue worker {worker_id} error: {e}", "ERROR")
+            log_print(f"ERROR: Upload worker {worker_id} error: {e}", "ERROR")
             await asyncio.sleep(1)
 
 
+# Sanitasi nama file: tabel translate (lookup C-level) untuk input ASCII,
+# regex precompiled hanya sebagai fallback untuk non-ASCII
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+_SAFE_NAME_TABLE = {
+    i: (chr(i) if chr(i).isalnum() or chr(i) in "._-" else "_")
+    for i in range(128)
+}
+
+
+@lru_cache(maxsize=256)
+def _sanitize_name(nomor_urut: str) -> str:
+    """Sanitasi nomor_urut menjadi nama file yang aman (memoized; input berulang
+    seperti nomor dokumen yang di-retry tidak perlu di-scan ulang)."""
+    if nomor_urut.isascii():
+        return nomor_urut.translate(_SAFE_NAME_TABLE).strip()
+    return _SAFE_NAME_RE.sub("_", nomor_urut).strip()
+
+
+def _crc_check_members(zip_file: zipfile.ZipFile, member_names: tuple) -> Optional[str]:
+    """CRC32-check member tertentu saja; return nama member pertama yang rusak.
+
+    zlib.crc32 di-stream per 64KB sehingga kerjanya dibatasi member kritis,
+    bukan seluruh arsip seperti testzip().
+    """
+    for member in member_names:
+        try:
+            info = zip_file.getinfo(member)
+        except KeyError:
+            continue  # keberadaan member dicek terpisah oleh caller
+        crc = 0
+        try:
+            with zip_file.open(info) as f:
+                while chunk := f.read(64 * 1024):
+                    crc = zlib.crc32(chunk, crc)
+        except Exception:
+            return member
+        if crc != info.CRC:
+            return member
+    return None
+
+
 def validate_docx_file(file_path: str) -> bool:
     """Validasi sederhana: pastikan file bisa dibuka sebagai ZIP dan punya struktur dasar DOCX.
     Tujuan: hanya mendeteksi file corrupt/tidak bisa dibuka. Sangat permisif."""
     try:
         with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Test integritas ZIP (akan return nama file rusak jika ada)
-            bad_file = zip_file.testzip()
-            if bad_file is not None:
-                log_print(f"ERROR: ZIP corruption detected in entry: {bad_file}", "ERROR")
-                return False
+            # Mode strict: CRC-check hanya member penting (bukan testzip() yang
+            # men-decompress SELURUH entry termasuk gambar/font embedded)
+            if os.getenv("STRICT_VALIDATE", "0") == "1":
+                bad_file = _crc_check_members(zip_file, ('word/document.xml', '[Content_Types].xml'))
+                if bad_file is not None:
+                    log_print(f"ERROR: ZIP corruption detected in entry: {bad_file}", "ERROR")
+                    return False
 
             contents = zip_file.namelist()
 
-            # Cek minimal struktur DOCX: folder word/ dan file utama document.xml
-            if not any(name.startswith('word/') for name in contents):
-                log_print("ERROR: Missing 'word/' folder in DOCX", "ERROR")
-                return False
-
+            # Cek minimal struktur DOCX: cukup document.xml (keberadaannya
+            # sekaligus membuktikan folder word/ ada) - satu pass saja
             if 'word/document.xml' not in contents:
                 log_print("ERROR: Missing 'word/document.xml' in DOCX", "ERROR")
                 return False
 
-            # Coba baca sebagian kecil dari document.xml untuk memastikan bisa dibaca
+            # Coba baca sebagian kecil dari document.xml untuk memastikan bisa
+            # dibaca; open()+read(4096) hanya men-decompress awal member
             try:
-                sample = zip_file.read('word/document.xml')[:100]
-                _ = len(sample)  # trigger read
+                with zip_file.open('word/document.xml') as doc:
+                    _ = doc.read(4096)
             except Exception as e:
                 log_print(f"ERROR: Unable to read 'word/document.xml': {e}", "ERROR")
                 return False
@@ -243,126 +798,221 @@ def validate_docx_file(file_path: str) -> bool:
 def validate_docx_content(file_content: bytes) -> tuple[bool, str]:
     """Validasi awal yang sederhana untuk memastikan file bukan corrupt.
     Hanya cek bisa dibuka sebagai ZIP dan memiliki struktur dasar DOCX."""
+    # Cek magic bytes ZIP dulu: input non-DOCX ditolak tanpa parsing apa pun
+    if not file_content.startswith(b"PK\x03\x04"):
+        return False, "File bukan ZIP (magic bytes salah)"
+
+    # Buka langsung dari memory; tidak perlu tulis temporary file ke disk
     try:
-        # Buat temporary file lalu coba buka sebagai ZIP
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_file.flush()
+        with zipfile.ZipFile(io.BytesIO(file_content)) as zip_file:
+            names = zip_file.namelist()
+            # document.xml sekaligus membuktikan folder word/ ada - satu pass saja
+            if 'word/document.xml' not in names:
+                if not any(n.startswith('word/') for n in names):
+                    return False, "Folder 'word/' tidak ditemukan"
+                return False, "File 'word/document.xml' tidak ditemukan"
+            # Cek ukuran dari central directory dulu (tanpa dekompresi sama sekali)
+            info = zip_file.getinfo('word/document.xml')
+            if info.file_size <= 0:
+                return False, "File 'word/document.xml' kosong"
+            # Coba baca sedikit untuk memastikan dapat diakses; open()+read(64)
+            # hanya men-decompress 64 byte, bukan seluruh member
+            with zip_file.open('word/document.xml') as doc:
+                _ = doc.read(64)
+        return True, "File dapat dibuka dan struktur dasar tersedia"
+    except zipfile.BadZipFile:
+        return False, "File corrupt/bukan ZIP DOCX yang valid"
+    except Exception as e:
+        return False, f"Gagal membuka konten DOCX: {e}"
 
-            try:
-                with zipfile.ZipFile(temp_file.name, 'r') as zip_file:
-                    names = zip_file.namelist()
-                    if not any(n.startswith('word/') for n in names):
-                        return False, "Folder 'word/' tidak ditemukan"
-                    if 'word/document.xml' not in names:
-                        return False, "File 'word/document.xml' tidak ditemukan"
-                    # Coba baca sedikit untuk memastikan dapat diakses
-                    _ = zip_file.read('word/document.xml')[:64]
-                return True, "File dapat dibuka dan struktur dasar tersedia"
-            except zipfile.BadZipFile:
-                return False, "File corrupt/bukan ZIP DOCX yang valid"
-            except Exception as e:
-                return False, f"Gagal membuka konten DOCX: {e}"
-            finally:
-                try:
-                    os.unlink(temp_file.name)
-                except Exception:
-                    pass
+
+# Process pool untuk konversi docx2pdf: tiap child process punya Word COM server
+# sendiri sehingga konversi benar-benar paralel (tidak rebutan GIL/satu instance Word)
+CONVERT_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+
+# Flag per-process (di child worker) supaya COM hanya di-init sekali per process
+_WORKER_COM_INITIALIZED = False
+
+# Instance Word persisten per child process: startup Word (~1-3 detik) hanya
+# dibayar sekali per worker, bukan per file seperti docx2pdf.convert
+_WORKER_WORD = None
+
+# wdFormatPDF untuk Word.Document.SaveAs
+_WD_FORMAT_PDF = 17
+
+
+def _get_worker_word(notes: Optional[List[Tuple[str, str]]] = None):
+    """Ambil (atau buat) instance Word.Application persisten untuk child process ini.
+
+    Mengembalikan None jika win32com tidak tersedia atau Word gagal start;
+    caller fallback ke docx2pdf.convert yang start Word per panggilan.
+    Kegagalan dicatat ke notes (di-log parent), bukan ke file log bersama.
+    """
+    global _WORKER_WORD
+    if _WORKER_WORD is not None:
+        return _WORKER_WORD
+    if win32com_client is None:
+        return None
+    try:
+        word = win32com_client.DispatchEx("Word.Application")
+        word.Visible = False
+        word.DisplayAlerts = 0
+        _WORKER_WORD = word
     except Exception as e:
-        return False, f"Error validasi awal: {e}"
+        if notes is not None:
+            notes.append(("WARNING", f"Could not start persistent Word instance: {e}"))
+    return _WORKER_WORD
 
 
-def convert_with_timeout(docx_path: str, pdf_path: str, timeout_seconds: int = 60) -> bool:
-    """Konversi DOCX ke PDF dengan timeout protection (docx2pdf) dengan improved COM handling."""
-    def conversion_task():
-        com_initialized = False
+def _drop_worker_word():
+    """Buang instance Word persisten (dipanggil saat COM error agar di-restart)."""
+    global _WORKER_WORD
+    if _WORKER_WORD is not None:
         try:
-            # Initialize COM untuk thread ini (Windows only) dengan apartment threading
-            import sys
-            if sys.platform == "win32":
+            _WORKER_WORD.Quit()
+        except Exception:
+            pass
+        _WORKER_WORD = None
+
+
+def _init_worker_com():
+    """Initialize COM sekali untuk child process (Windows only)."""
+    global _WORKER_COM_INITIALIZED
+    if _WORKER_COM_INITIALIZED:
+        return
+    if sys.platform == "win32":
+        if pythoncom is None:
+            log_print("WARNING: pythoncom not available, COM may not work properly", "WARNING")
+            return
+        try:
+            # Use COINIT_APARTMENTTHREADED untuk better stability
+            pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+            _WORKER_COM_INITIALIZED = True
+        except Exception as e:
+            log_print(f"WARNING: COM initialization failed: {e}", "WARNING")
+
+
+def _convert_worker(docx_path: str, pdf_path: str) -> Tuple[bool, List[Tuple[str, str]]]:
+    """Jalan di child process: konversi DOCX ke PDF via docx2pdf (Word/Automator).
+
+    Return (sukses, notes); notes = list (level, pesan) diagnosa yang di-log
+    parent — child pool tidak boleh menulis ke file log bersama (lihat
+    setup_file_logging).
+    """
+    notes: List[Tuple[str, str]] = []
+    try:
+        _init_worker_com()
+
+        # Jalur cepat: reuse instance Word persisten milik process ini
+        word = _get_worker_word(notes)
+        if word is not None:
+            try:
+                doc = word.Documents.Open(os.path.abspath(docx_path), ReadOnly=True)
                 try:
-                    import pythoncom
-                    # Use COINIT_APARTMENTTHREADED untuk better stability
-                    pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
-                    com_initialized = True
-                    log_print("DEBUG: COM initialized with apartment threading", "DEBUG")
-                except ImportError:
-                    log_print("WARNING: pythoncom not available, COM may not work properly", "WARNING")
-                except Exception as e:
-                    log_print(f"WARNING: COM initialization failed: {e}", "WARNING")
-            
-            # Lakukan konversi (menggunakan Microsoft Word/Automator tergantung platform)
-            # Note: On some Windows environments, docx2pdf works more reliably when the output
-            #      parameter is a DIRECTORY instead of a FILE path. We'll direct output to the
-            #      target directory and then move/rename to the desired file path if needed.
-            outdir = os.path.dirname(pdf_path) or os.getcwd()
-            os.makedirs(outdir, exist_ok=True)
-            convert(docx_path, outdir)
-
-            # Ensure produced file exists; if target filename differs, move it
-            produced_pdf = os.path.join(
-                outdir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
-            )
-            if not os.path.exists(produced_pdf):
-                raise Exception("docx2pdf did not produce expected PDF output")
+                    doc.SaveAs(os.path.abspath(pdf_path), FileFormat=_WD_FORMAT_PDF)
+                finally:
+                    doc.Close(False)
+                return True, notes
+            except Exception as e:
+                # Instance Word mungkin sudah mati - buang dan fallback ke docx2pdf
+                notes.append(("WARNING", f"Persistent Word conversion failed, falling back to docx2pdf: {e}"))
+                _drop_worker_word()
+
+        # Lakukan konversi (menggunakan Microsoft Word/Automator tergantung platform)
+        # Note: On some Windows environments, docx2pdf works more reliably when the output
+        #      parameter is a DIRECTORY instead of a FILE path. We'll direct output to the
+        #      target directory and then move/rename to the desired file path if needed.
+        outdir = os.path.dirname(pdf_path) or os.getcwd()
+        os.makedirs(outdir, exist_ok=True)
+        convert(docx_path, outdir)
+
+        # Ensure produced file exists; if target filename differs, move it
+        produced_pdf = os.path.join(
+            outdir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
+        )
+        if not os.path.exists(produced_pdf):
+            raise Exception("docx2pdf did not produce expected PDF output")
 
-            if os.path.abspath(produced_pdf) != os.path.abspath(pdf_path):
+        if os.path.abspath(produced_pdf) != os.path.abspath(pdf_path):
+            try:
+                # os.replace: rename atomik yang sekaligus menimpa target
                 try:
-                    if os.path.exists(pdf_path):
-                        os.remove(pdf_path)
+                    os.replace(produced_pdf, pdf_path)
+                except OSError:
+                    # Fallback copy-based kalau source/target beda filesystem
                     shutil.move(produced_pdf, pdf_path)
-                except Exception as move_err:
-                    raise Exception(f"Failed to move docx2pdf output to target path: {move_err}")
-            
-            # Cleanup COM
-            if sys.platform == "win32" and com_initialized:
-                try:
-                    import pythoncom
-                    pythoncom.CoUninitialize()
-                    log_print("DEBUG: COM uninitialized for conversion thread", "DEBUG")
-                except Exception as e:
-                    log_print(f"WARNING: COM cleanup failed: {e}", "WARNING")
-            
-            return True
-        except Exception as e:
-            error_msg = str(e)
-            log_print(f"ERROR: Conversion failed: {error_msg}", "ERROR")
-            
-            # Check for specific COM errors
-            if "-2147023170" in error_msg or "remote procedure call failed" in error_msg.lower():
-                log_print("ERROR: COM/RPC failure detected - MS Word may be unavailable or hanging", "ERROR")
-            elif "0x800706be" in error_msg:
-                log_print("ERROR: RPC server unavailable - MS Word service may be down", "ERROR")
-            
-            # Cleanup COM jika error
-            if sys.platform == "win32" and com_initialized:
-                try:
-                    import pythoncom
-                    pythoncom.CoUninitialize()
-                except Exception:
-                    pass
-            return False
-    
-    # Gunakan ThreadPoolExecutor dengan timeout
-    with ThreadPoolExecutor(max_workers=1) as executor:
-        try:
-            future = executor.submit(conversion_task)
-            result = future.result(timeout=timeout_seconds)
-            return result
-        except FutureTimeoutError:
-            log_print(f"ERROR: Conversion timeout after {timeout_seconds} seconds - likely MS Word hang", "ERROR")
-            # Coba terminate proses yang hang
+            except Exception as move_err:
+                raise Exception(f"Failed to move docx2pdf output to target path: {move_err}")
+
+        return True, notes
+    except Exception as e:
+        error_msg = str(e)
+        notes.append(("ERROR", f"Conversion failed: {error_msg}"))
+
+        # Check for specific COM errors
+        if "-2147023170" in error_msg or "remote procedure call failed" in error_msg.lower():
+            notes.append(("ERROR", "COM/RPC failure detected - MS Word may be unavailable or hanging"))
+        elif "0x800706be" in error_msg:
+            notes.append(("ERROR", "RPC server unavailable - MS Word service may be down"))
+        return False, notes
+
+
+def get_convert_process_pool() -> ProcessPoolExecutor:
+    """Ambil (atau buat) process pool bersama untuk konversi docx2pdf."""
+    global CONVERT_PROCESS_POOL
+    if CONVERT_PROCESS_POOL is None:
+        # Flag diwariskan ke setiap child spawn (termasuk respawn): versi
+        # child setup_file_logging tidak memasang file handler, sehingga
+        # rollover log parent tidak pernah bentrok dengan handle child
+        os.environ["CONVERTER_POOL_CHILD"] = "1"
+        # COM di-init via initializer sehingga child siap sebelum task pertama
+        CONVERT_PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=MAX_CONCURRENT_WORKERS, initializer=_init_worker_com
+        )
+        log_print(f"INFO: Started conversion process pool with {MAX_CONCURRENT_WORKERS} workers")
+    return CONVERT_PROCESS_POOL
+
+
+def _rebuild_convert_pool():
+    """Matikan pool konversi dan biarkan dibuat ulang lazily.
+
+    Dipanggil saat timeout konversi: child yang menggantung di COM call tidak
+    bisa di-cancel dari luar, jadi seluruh pool di-kill dan di-rebuild agar
+    Word/soffice yang hang benar-benar mati bersama processnya.
+    """
+    global CONVERT_PROCESS_POOL
+    pool = CONVERT_PROCESS_POOL
+    CONVERT_PROCESS_POOL = None
+    if pool is None:
+        return
+    try:
+        for p in list(getattr(pool, "_processes", {}).values()):
             try:
-                future.cancel()
-            except:
+                p.kill()
+            except Exception:
                 pass
-            return False
-        except Exception as e:
-            log_print(f"ERROR: Conversion executor error: {e}", "ERROR")
-            return False
+    except Exception:
+        pass
+    pool.shutdown(wait=False, cancel_futures=True)
+    log_print("WARNING: Conversion process pool killed and scheduled for rebuild", "WARNING")
+
+
+# Memo hasil probe soffice: jalan filesystem/PATH hanya sekali, bukan per konversi
+_SOFFICE_PATH: Optional[str] = None
+_SOFFICE_PROBED = False
 
 
 def _find_soffice_executable() -> Optional[str]:
+    """Lokasi soffice, di-memoize (reset via invalidate_engine_cache)."""
+    global _SOFFICE_PATH, _SOFFICE_PROBED
+    if _SOFFICE_PROBED:
+        return _SOFFICE_PATH
+    _SOFFICE_PATH = _probe_soffice_executable()
+    _SOFFICE_PROBED = True
+    return _SOFFICE_PATH
+
+
+def _probe_soffice_executable() -> Optional[str]:
     """Cari executable LibreOffice (soffice) dengan beberapa strategi.
     Urutan: ENV var -> lokasi default Windows -> PATH.
     """
@@ -426,12 +1076,14 @@ def check_conversion_engines() -> Dict[str, bool]:
     soffice = _find_soffice_executable()
     if soffice:
         try:
-            # Quick version check to verify LibreOffice is working
+            # Quick version check to verify LibreOffice is working; banner cuma
+            # satu baris jadi timeout pendek, dan tanpa console flash di Windows
             result = subprocess.run(
                 [soffice, "--version"],
                 capture_output=True,
-                timeout=10,
-                text=True
+                timeout=3,
+                text=True,
+                creationflags=(subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0),
             )
             if result.returncode == 0:
                 engines["libreoffice"] = True
@@ -443,19 +1095,18 @@ def check_conversion_engines() -> Dict[str, bool]:
     if sys.platform in ("win32", "darwin"):
         try:
             if sys.platform == "win32":
-                import pythoncom
-                pythoncom.CoInitialize()
-                try:
-                    import win32com.client
-                    word = win32com.client.Dispatch("Word.Application")
-                    word.Visible = False
-                    word.Quit()
-                    engines["ms_word"] = True
-                    log_print("INFO: MS Word COM interface available")
-                except Exception:
-                    pass
-                finally:
-                    pythoncom.CoUninitialize()
+                if pythoncom is not None:
+                    pythoncom.CoInitialize()
+                    try:
+                        word = win32com_client.Dispatch("Word.Application")
+                        word.Visible = False
+                        word.Quit()
+                        engines["ms_word"] = True
+                        log_print("INFO: MS Word COM interface available")
+                    except Exception:
+                        pass
+                    finally:
+                        pythoncom.CoUninitialize()
             else:  # macOS
                 # Check if MS Word is installed via Automator
                 engines["ms_word"] = True  # Assume available on macOS
@@ -470,18 +1121,26 @@ def cleanup_hanging_processes():
     if PSUTIL_AVAILABLE:
         try:
             cleaned = 0
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            # Sampling wall clock sekali untuk seluruh sweep; create_time ikut
+            # di-fetch dalam satu batched walk (tanpa syscall kedua per proses)
+            now_ts = time.time()
+            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
                 try:
-                    name = proc.info['name'].lower()
+                    name = (proc.info['name'] or '').lower()
+                    # Prune dini: proses yang tidak relevan (mayoritas process
+                    # table) tidak perlu join+lower cmdline-nya
+                    if not name.startswith(('soffice', 'libreoffice', 'winword')):
+                        continue
                     cmdline = ' '.join(proc.info['cmdline'] or []).lower()
-                    
+
                     # Check for LibreOffice processes - only kill if running too long
                     if ('soffice' in name or 'libreoffice' in name) and '--headless' in cmdline:
                         try:
-                            create_time = proc.create_time()
+                            create_time = proc.info['create_time']
+                            age_minutes = int((now_ts - create_time) / 60)
                             # Only kill LibreOffice processes running longer than 5 minutes
-                            if (datetime.now().timestamp() - create_time) > 300:  # 5 minutes
-                                log_print(f"INFO: Terminating long-running LibreOffice process PID {proc.info['pid']} (running for {int((datetime.now().timestamp() - create_time)/60)} minutes)")
+                            if (now_ts - create_time) > 300:  # 5 minutes
+                                log_print(f"INFO: Terminating long-running LibreOffice process PID {proc.info['pid']} (running for {age_minutes} minutes)")
                                 proc.terminate()
                                 try:
                                     proc.wait(timeout=5)
@@ -490,17 +1149,17 @@ def cleanup_hanging_processes():
                                 cleaned += 1
                             else:
                                 # Don't kill recent LibreOffice processes - they might be actively converting
-                                log_print(f"DEBUG: Skipping recent LibreOffice process PID {proc.info['pid']} (running for {int((datetime.now().timestamp() - create_time)/60)} minutes)", "DEBUG")
+                                log_print(f"DEBUG: Skipping recent LibreOffice process PID {proc.info['pid']} (running for {age_minutes} minutes)", "DEBUG")
                         except Exception:
                             # If we can't get create time, don't kill the process
                             pass
-                        
+
                     # Check for Word processes (Windows)
                     elif sys.platform == "win32" and 'winword' in name:
                         # Only kill if it's been running for a while without user interaction
                         try:
-                            create_time = proc.create_time()
-                            if (datetime.now().timestamp() - create_time) > 300:  # 5 minutes
+                            create_time = proc.info['create_time']
+                            if (now_ts - create_time) > 300:  # 5 minutes
                                 log_print(f"INFO: Terminating old Word process PID {proc.info['pid']}")
                                 proc.terminate()
                                 cleaned += 1
@@ -512,6 +1171,8 @@ def cleanup_hanging_processes():
                     
             if cleaned > 0:
                 log_print(f"INFO: Cleaned up {cleaned} hanging processes with psutil")
+                # Kondisi engine bisa berubah setelah proses dimatikan
+                invalidate_engine_cache()
             else:
                 log_print("INFO: No hanging processes found to cleanup")
             return
@@ -546,10 +1207,159 @@ def cleanup_hanging_processes():
             log_print(f"DEBUG: Basic process cleanup failed: {e}", "DEBUG")
 
 
-def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int = 60) -> bool:
+def _kill_procs_holding_work_dir(work_dir: str) -> int:
+    """Recovery terarah: terminate hanya proses konversi yang benar-benar
+    memegang handle file di bawah work_dir request ini.
+
+    Tidak ada pemegang handle = penyebab error bukan "file in use" (mis. ACL,
+    disk penuh) dan membunuh soffice/winword lain hanya mengganggu konversi
+    yang sedang jalan. Return jumlah proses yang dimatikan.
+    """
+    if not PSUTIL_AVAILABLE:
+        return 0
+    killed = 0
+    prefix = os.path.abspath(work_dir)
+    for proc in psutil.process_iter(['pid', 'name']):
+        try:
+            name = (proc.info['name'] or '').lower()
+            if not name.startswith(('soffice', 'libreoffice', 'winword')):
+                continue
+            if not any(os.path.abspath(f.path).startswith(prefix) for f in proc.open_files()):
+                continue
+            log_print(
+                f"WARNING: Terminating {proc.info['name']} (PID {proc.info['pid']}) holding files in {work_dir}",
+                "WARNING",
+            )
+            proc.terminate()
+            try:
+                proc.wait(timeout=3)
+            except psutil.TimeoutExpired:
+                proc.kill()
+            killed += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return killed
+
+
+# Pool profile dir LibreOffice yang dipakai ulang antar konversi: profile yang
+# sudah "jadi" (registrymodifications, font cache) memangkas startup soffice
+# dibanding membangun profile kosong setiap request. Satu profile hanya dipakai
+# satu konversi pada satu waktu (checkout/checkin via queue).
+LO_PROFILE_POOL: Optional[asyncio.Queue] = None
+# Profile LibreOffice adalah scratch data ribuan file kecil (xcu, font cache);
+# di Linux taruh di tmpfs (/dev/shm) supaya init/recycle profile bebas disk
+# I/O — penting saat BASE_DIR di spinning disk / network share. Template dan
+# pool dibangun ulang saat startup, jadi tidak ada yang hilang saat reboot.
+if sys.platform.startswith("linux") and os.path.isdir("/dev/shm"):
+    LO_PROFILE_BASE = "/dev/shm/converter_lo_profiles"
+else:
+    LO_PROFILE_BASE = os.path.join(BASE_DIR, ".lo_profiles")
+LO_PROFILE_TEMPLATE = os.path.join(LO_PROFILE_BASE, "template")
+
+
+def _build_lo_profile_template() -> bool:
+    """Bangun profile template yang sudah melewati first-run soffice.
+
+    First-run (registrymodifications.xcu, font cache, dsb) makan beberapa
+    detik; dibayar sekali di sini, lalu profile pool di-seed via copytree
+    sehingga konversi pertama maupun profile hasil recycle langsung warm.
+    """
+    soffice = _find_soffice_executable()
+    if not soffice:
+        return False
+    if os.path.isdir(os.path.join(LO_PROFILE_TEMPLATE, "user")):
+        # Template dari run sebelumnya masih ada dan bisa dipakai ulang
+        return True
+    os.makedirs(LO_PROFILE_TEMPLATE, exist_ok=True)
+    try:
+        subprocess.run(
+            [
+                soffice,
+                "--headless",
+                "--terminate_after_init",
+                f"-env:UserInstallation={Path(LO_PROFILE_TEMPLATE).as_uri()}",
+            ],
+            capture_output=True,
+            timeout=60,
+            creationflags=(subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0),
+        )
+    except Exception as e:
+        log_print(f"WARNING: Failed to prewarm LibreOffice profile template: {e}", "WARNING")
+        return False
+    return os.path.isdir(os.path.join(LO_PROFILE_TEMPLATE, "user"))
+
+
+def _recycle_lo_profile(profile_dir: str):
+    """Buang profile yang dicurigai korup dan salin ulang dari template."""
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    if os.path.isdir(os.path.join(LO_PROFILE_TEMPLATE, "user")):
+        try:
+            shutil.copytree(LO_PROFILE_TEMPLATE, profile_dir)
+            return
+        except Exception as e:
+            log_print(f"WARNING: Failed to reseed LibreOffice profile from template: {e}", "WARNING")
+    os.makedirs(profile_dir, exist_ok=True)
+
+
+def _init_lo_profile_pool():
+    """Siapkan pool profile dir persisten (seeded dari template), satu per worker.
+
+    Dipanggil via asyncio.to_thread dari startup: first-run template bisa
+    makan beberapa detik dan tidak boleh menahan event loop. Sebelum pool
+    siap, convert_with_libreoffice fallback ke profile sekali-pakai.
+    """
+    global LO_PROFILE_POOL
+    template_ready = _build_lo_profile_template()
+    pool = asyncio.Queue()
+    for i in range(MAX_CONCURRENT_WORKERS):
+        profile_dir = os.path.join(LO_PROFILE_BASE, f"profile_{i}")
+        if template_ready and not os.path.isdir(os.path.join(profile_dir, "user")):
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            try:
+                shutil.copytree(LO_PROFILE_TEMPLATE, profile_dir)
+            except Exception:
+                os.makedirs(profile_dir, exist_ok=True)
+        else:
+            os.makedirs(profile_dir, exist_ok=True)
+        pool.put_nowait(profile_dir)
+    LO_PROFILE_POOL = pool
+    log_print(
+        f"INFO: Initialized {MAX_CONCURRENT_WORKERS} reusable LibreOffice profile dirs"
+        f" (template {'ready' if template_ready else 'unavailable'})"
+    )
+
+
+# Argumen statis soffice + flags subprocess: dibangun sekali, bukan per konversi
+_SOFFICE_BASE_ARGS = (
+    "--headless",
+    "--norestore",
+    "--nolockcheck",
+    "--nodefault",
+    "--nofirststartwizard",
+    "--invisible",  # Additional flag for better headless operation
+)
+if sys.platform == "win32":
+    # CREATE_NEW_PROCESS_GROUP untuk isolasi proses yang lebih baik
+    _SUBPROCESS_FLAGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+else:
+    # POSIX: session baru untuk isolasi proses yang lebih baik
+    _SUBPROCESS_FLAGS = {"start_new_session": True}
+
+
+def _move_overwrite(src: str, dst: str):
+    """Pindahkan file menimpa tujuan: os.replace = satu syscall atomik;
+    fallback ke move copy-based saat beda filesystem (mis. volume lain)."""
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+
+async def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int = 60) -> bool:
     """
     Konversi DOCX ke PDF menggunakan LibreOffice (headless) dengan improved timeout dan error handling.
-    Menghindari hang dengan menjalankan proses dan mematikan jika timeout.
+    Async subprocess: event loop tetap jalan selama soffice bekerja (10-60 detik),
+    tanpa memblokir thread executor. Hang dihindari dengan kill saat timeout.
     """
     soffice = _find_soffice_executable()
     if not soffice:
@@ -557,67 +1367,69 @@ def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int
         return False
 
     outdir = os.path.dirname(pdf_path) or os.getcwd()
-    
-    # Ensure output directory exists
-    os.makedirs(outdir, exist_ok=True)
 
-    cmd = [
+    # Ensure output directory exists (di thread: outdir bisa di network share)
+    await asyncio.to_thread(os.makedirs, outdir, exist_ok=True)
+
+    # Ambil profile dari pool (profile warm dipakai ulang antar konversi).
+    # Fallback ke profile sekali-pakai di work dir kalau pool belum siap
+    # (mis. dipanggil sebelum startup_event). Paralel tetap aman: satu
+    # profile hanya dipegang satu konversi pada satu waktu.
+    pooled_profile = None
+    if LO_PROFILE_POOL is not None:
+        pooled_profile = await LO_PROFILE_POOL.get()
+        profile_dir = pooled_profile
+    else:
+        profile_dir = os.path.join(outdir, ".lo_profile")
+        os.makedirs(profile_dir, exist_ok=True)
+    profile_url = Path(profile_dir).as_uri()
+
+    cmd = (
         soffice,
-        "--headless",
-        "--norestore",
-        "--nolockcheck",
-        "--nodefault",
-        "--nofirststartwizard",
-        "--invisible",  # Additional flag for better headless operation
+        *_SOFFICE_BASE_ARGS,
+        f"-env:UserInstallation={profile_url}",
         "--convert-to",
         "pdf:writer_pdf_Export",
         "--outdir",
         outdir,
         docx_path,
-    ]
+    )
 
     log_print(f"INFO: Trying conversion via LibreOffice: {' '.join(cmd)}")
     proc = None
+    recycle_profile = False
     try:
-        # Enhanced process creation with better isolation
-        kwargs = {
-            "stdout": subprocess.PIPE,
-            "stderr": subprocess.PIPE,
-            "stdin": subprocess.DEVNULL,  # Prevent hanging on input
-        }
-        
-        if sys.platform == "win32":
-            try:
-                # Use CREATE_NEW_PROCESS_GROUP for better process isolation
-                kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
-            except Exception:
-                kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
-        else:
-            # POSIX: create new session for better process isolation
-            kwargs["preexec_fn"] = os.setsid if hasattr(os, "setsid") else None
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,  # Prevent hanging on input
+            **_SUBPROCESS_FLAGS,
+        )
 
-        proc = subprocess.Popen(cmd, **kwargs)
-        
         try:
-            stdout, stderr = proc.communicate(timeout=timeout_seconds)
-        except subprocess.TimeoutExpired:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
             log_print(f"ERROR: LibreOffice conversion timeout after {timeout_seconds} seconds", "ERROR")
+            recycle_profile = True
             try:
                 # Try graceful termination first
                 proc.terminate()
                 try:
-                    proc.wait(timeout=5)
-                except subprocess.TimeoutExpired:
+                    await asyncio.wait_for(proc.wait(), timeout=5)
+                except asyncio.TimeoutError:
                     # Force kill if terminate doesn't work
                     proc.kill()
-                    proc.wait()
+                    await proc.wait()
             except Exception as e:
                 log_print(f"WARNING: Failed to terminate LibreOffice process: {e}", "WARNING")
             return False
 
-        out_txt = (stdout or b"").decode(errors="ignore")
-        err_txt = (stderr or b"").decode(errors="ignore")
-        
+        # Potong sebelum decode: soffice bisa memuntahkan ratusan KB warning,
+        # padahal yang dipakai log/pattern-match hanya awal output
+        out_txt = stdout[:512].decode("utf-8", "replace") if stdout else ""
+        err_txt = stderr[:2048].decode("utf-8", "replace") if stderr else ""
+
         if out_txt.strip():
             log_print(f"DEBUG: LibreOffice stdout: {out_txt[:500]}", "DEBUG")
         if err_txt.strip():
@@ -625,6 +1437,7 @@ def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int
 
         if proc.returncode != 0:
             log_print(f"ERROR: LibreOffice exited with code {proc.returncode}", "ERROR")
+            recycle_profile = True
             if err_txt:
                 # Log specific error patterns
                 if "Error:" in err_txt or "Exception:" in err_txt:
@@ -637,7 +1450,7 @@ def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int
         expected_name = os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
         produced_pdf = os.path.join(outdir, expected_name)
         
-        if not os.path.exists(produced_pdf):
+        if not await asyncio.to_thread(os.path.exists, produced_pdf):
             log_print(f"ERROR: LibreOffice did not produce expected PDF file: {produced_pdf}", "ERROR")
             # List files in output directory for debugging
             try:
@@ -647,23 +1460,23 @@ def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int
                 pass
             return False
 
-        # Move to target path if different
+        # Move to target path if different; move lintas filesystem bisa
+        # copy-based, jadi jalankan di thread agar event loop tidak tertahan
         if os.path.abspath(produced_pdf) != os.path.abspath(pdf_path):
             try:
-                if os.path.exists(pdf_path):
-                    os.remove(pdf_path)
-                shutil.move(produced_pdf, pdf_path)
+                await asyncio.to_thread(_move_overwrite, produced_pdf, pdf_path)
                 log_print(f"INFO: Moved PDF from {produced_pdf} to {pdf_path}")
             except Exception as e:
                 log_print(f"ERROR: Failed to move produced PDF to target path: {e}", "ERROR")
                 return False
 
-        # Verify final PDF exists and has reasonable size
-        if not os.path.exists(pdf_path):
+        # Verify final PDF exists and has reasonable size (satu stat)
+        try:
+            pdf_size = (await asyncio.to_thread(os.stat, pdf_path)).st_size
+        except FileNotFoundError:
             log_print(f"ERROR: Final PDF not found at {pdf_path}", "ERROR")
             return False
-            
-        pdf_size = os.path.getsize(pdf_path)
+
         if pdf_size < 100:  # PDF should be at least 100 bytes
             log_print(f"ERROR: Generated PDF is too small ({pdf_size} bytes) - likely corrupt", "ERROR")
             return False
@@ -679,85 +1492,211 @@ def convert_with_libreoffice(docx_path: str, pdf_path: str, timeout_seconds: int
         return False
     finally:
         # Ensure process is cleaned up
-        if proc and proc.poll() is None:
+        if proc and proc.returncode is None:
             try:
                 proc.terminate()
-                proc.wait(timeout=2)
+                await asyncio.wait_for(proc.wait(), timeout=2)
             except Exception:
                 try:
                     proc.kill()
                 except Exception:
                     pass
+        # Kembalikan profile ke pool untuk konversi berikutnya; setelah
+        # timeout/exit error, reset dulu dari template (profile bisa korup
+        # dan membuat semua konversi berikutnya di profile itu ikut gagal)
+        if pooled_profile is not None:
+            if recycle_profile:
+                await asyncio.to_thread(_recycle_lo_profile, pooled_profile)
+            LO_PROFILE_POOL.put_nowait(pooled_profile)
+
+
+async def convert_batch_with_libreoffice(
+    items: List[Tuple[str, str, str]], timeout_seconds: int = 60
+) -> Dict[str, bool]:
+    """Konversi beberapa DOCX sekaligus dalam satu invocation soffice.
+
+    Startup soffice (~detik) dibayar sekali untuk seluruh batch, bukan per
+    file. items berisi (request_id, path_docx, path_pdf); return map
+    request_id -> sukses. Item yang gagal di sini akan dicoba ulang lewat
+    jalur per-item biasa oleh caller.
+    """
+    results = {request_id: False for request_id, _, _ in items}
+    soffice = _find_soffice_executable()
+    if not soffice:
+        return results
 
+    # Outdir bersama sekali-pakai; hasil dipindah ke path final per request
+    outdir = os.path.join(BASE_DIR, f".batch_{uuid.uuid4().hex}")
+    os.makedirs(outdir, exist_ok=True)
 
-async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any]:
-    """Memproses satu request konversi"""
-    # Validasi nama file
-    safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", request.nomor_urut).strip()
-    if not safe_name or safe_name in {".", ".."}:
-        raise HTTPException(status_code=400, detail="nomor_urut tidak valid setelah sanitasi")
-
-    # Folder penyimpanan lokal
-    base_dir = os.getenv("DOC_LOCAL_DIR", os.path.join(os.path.dirname(__file__), "document"))
-    os.makedirs(base_dir, exist_ok=True)
+    pooled_profile = None
+    if LO_PROFILE_POOL is not None:
+        pooled_profile = await LO_PROFILE_POOL.get()
+        profile_dir = pooled_profile
+    else:
+        profile_dir = os.path.join(outdir, ".lo_profile")
+        os.makedirs(profile_dir, exist_ok=True)
+    profile_url = Path(profile_dir).as_uri()
 
-    path_docx = os.path.join(base_dir, f"{safe_name}.docx")
-    path_pdf = os.path.join(base_dir, f"{safe_name}.pdf")
+    cmd = (
+        soffice,
+        *_SOFFICE_BASE_ARGS,
+        f"-env:UserInstallation={profile_url}",
+        "--convert-to",
+        "pdf:writer_pdf_Export",
+        "--outdir",
+        outdir,
+        *(path_docx for _, path_docx, _ in items),
+    )
 
-    # Hapus file lama jika ada (DOCX dan PDF) dengan cleanup proses hanging
+    # Timeout proporsional jumlah file; dokumen lambat tidak langsung
+    # menggagalkan seluruh batch
+    total_timeout = timeout_seconds * len(items)
+    log_print(f"INFO: Trying batched LibreOffice conversion of {len(items)} files")
+    proc = None
+    recycle_profile = False
     try:
-        if os.path.exists(path_docx):
-            # Cleanup hanging processes before removing file
-            cleanup_hanging_processes()
-            # Wait a bit for processes to terminate
-            import time
-            time.sleep(0.5)
-            os.remove(path_docx)
-            log_print(f"INFO: Removed existing DOCX file: {path_docx}")
-    except Exception as e:
-        log_print(f"WARNING: Failed to remove existing DOCX file: {e}", "WARNING")
-        # Force cleanup and try again
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,
+            **_SUBPROCESS_FLAGS,
+        )
+
         try:
-            cleanup_hanging_processes()
-            import time
-            time.sleep(1)
-            if os.path.exists(path_docx):
-                os.remove(path_docx)
-                log_print(f"INFO: Force removed DOCX file after cleanup: {path_docx}")
-        except Exception as e2:
-            log_print(f"ERROR: Could not remove DOCX file even after cleanup: {e2}", "ERROR")
-            # Last resort: try to find and kill specific processes using the file
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=total_timeout)
+        except asyncio.TimeoutError:
+            log_print(f"ERROR: Batched LibreOffice conversion timeout after {total_timeout} seconds", "ERROR")
+            recycle_profile = True
             try:
-                if sys.platform == "win32":
-                    # Use handle.exe if available, or force kill all soffice processes
-                    subprocess.run(["taskkill", "/f", "/im", "soffice.exe"], 
-                                 capture_output=True, timeout=5)
-                    subprocess.run(["taskkill", "/f", "/im", "soffice.bin"], 
-                                 capture_output=True, timeout=5)
-                    import time
-                    time.sleep(2)
-                    if os.path.exists(path_docx):
-                        os.remove(path_docx)
-                        log_print(f"INFO: Successfully removed DOCX after force kill: {path_docx}")
-                    else:
-                        log_print(f"WARNING: DOCX file no longer exists: {path_docx}", "WARNING")
-                else:
-                    raise Exception(f"Gagal menghapus file DOCX yang sedang digunakan: {e2}")
-            except Exception as e3:
-                log_print(f"ERROR: Final attempt to remove DOCX failed: {e3}", "ERROR")
-                raise Exception(f"Gagal menghapus file DOCX yang sedang digunakan: {e3}")
-    
-    try:
-        if os.path.exists(path_pdf):
-            os.remove(path_pdf)
-            log_print(f"INFO: Removed existing PDF file: {path_pdf}")
+                proc.terminate()
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+            except Exception as e:
+                log_print(f"WARNING: Failed to terminate LibreOffice process: {e}", "WARNING")
+            return results
+
+        if proc.returncode != 0:
+            err_txt = stderr[:2048].decode("utf-8", "replace") if stderr else ""
+            log_print(f"WARNING: Batched LibreOffice exited with code {proc.returncode}: {err_txt[:200]}", "WARNING")
+            recycle_profile = True
+            # Jangan langsung menyerah: sebagian file bisa saja sudah jadi
+
+        # Petakan hasil per file ke path final masing-masing request
+        for request_id, path_docx, path_pdf in items:
+            expected = os.path.join(outdir, os.path.splitext(os.path.basename(path_docx))[0] + ".pdf")
+            if not await asyncio.to_thread(os.path.exists, expected):
+                continue
+            try:
+                await asyncio.to_thread(_move_overwrite, expected, path_pdf)
+                results[request_id] = True
+            except Exception as e:
+                log_print(f"WARNING: Failed to move batched PDF for {request_id}: {e}", "WARNING")
+
+        log_print(f"INFO: Batched LibreOffice conversion produced {sum(results.values())}/{len(items)} PDFs")
+        return results
+
     except Exception as e:
-        log_print(f"WARNING: Failed to remove existing PDF file: {e}", "WARNING")
+        log_print(f"ERROR: Batched LibreOffice conversion failed: {e}", "ERROR")
+        return results
+    finally:
+        if proc and proc.returncode is None:
+            try:
+                proc.terminate()
+                await asyncio.wait_for(proc.wait(), timeout=2)
+            except Exception:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+        await asyncio.to_thread(shutil.rmtree, outdir, ignore_errors=True)
+        if pooled_profile is not None:
+            if recycle_profile:
+                await asyncio.to_thread(_recycle_lo_profile, pooled_profile)
+            LO_PROFILE_POOL.put_nowait(pooled_profile)
+
+
+def _build_multipart_upload(path_pdf: str, file_size: int, data: Dict[str, str]):
+    """Susun body multipart/form-data streaming untuk upload PDF.
+
+    Mengembalikan (headers, generator_factory). Content-Length dihitung eksak
+    supaya target server yang tidak mendukung chunked encoding tetap jalan,
+    sementara isi file dialirkan per 64KB (memori O(chunk), bukan O(filesize)).
+    """
+    boundary = uuid.uuid4().hex
+    preamble_parts = []
+    for name, value in data.items():
+        preamble_parts.append(
+            (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode()
+        )
+    filename = os.path.basename(path_pdf)
+    preamble_parts.append(
+        (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="docupload"; filename="{filename}"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode()
+    )
+    preamble = b"".join(preamble_parts)
+    trailer = f"\r\n--{boundary}--\r\n".encode()
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(preamble) + file_size + len(trailer)),
+    }
+
+    async def body():
+        yield preamble
+        if file_size > 0:
+            try:
+                # Slicing mmap menghasilkan bytes (O(chunk) memori) tanpa read()
+                # syscall per chunk. Sengaja bukan memoryview: consumer httpx
+                # masih memegang chunk terakhir saat mmap di-close, dan export
+                # memoryview yang hidup membuat close() kena BufferError
+                with open(path_pdf, "rb") as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        for offset in range(0, file_size, 64 * 1024):
+                            yield mm[offset:offset + 64 * 1024]
+            except (ValueError, OSError):
+                # Fallback async read (mis. filesystem tanpa dukungan mmap)
+                async with aiofiles.open(path_pdf, "rb") as f:
+                    while chunk := await f.read(64 * 1024):
+                        yield chunk
+        yield trailer
+
+    return headers, body
+
+
+async def _prepare_work_files(request: ConversionRequest) -> Tuple[str, str, str]:
+    """Siapkan direktori kerja request dan pindahkan file staging ke dalamnya.
+
+    Return (work_dir, path_docx, path_pdf). Dipisah dari _convert_stage agar
+    jalur batch bisa menyiapkan semua file dulu sebelum satu invocation soffice.
+    """
+    # Validasi nama file
+    safe_name = _sanitize_name(request.nomor_urut)
+    if not safe_name or safe_name in {".", ".."}:
+        raise HTTPException(status_code=400, detail="nomor_urut tidak valid setelah sanitasi")
+
+    # Direktori kerja terisolasi per request: dua request dengan nomor_urut sama
+    # tidak pernah saling menimpa file di tengah konversi, dan tidak ada lagi
+    # file lama yang harus dihapus (dulu sampai perlu taskkill proses hanging)
+    work_dir = os.path.join(BASE_DIR, request.request_id)
+    await asyncio.to_thread(os.makedirs, work_dir, exist_ok=True)
 
-    # Simpan file DOCX
+    path_docx = os.path.join(work_dir, f"{safe_name}.docx")
+    path_pdf = os.path.join(work_dir, f"{safe_name}.pdf")
+
+    # Pindahkan file staging hasil streaming upload ke path final (di thread executor)
     try:
-        with open(path_docx, "wb") as f:
-            f.write(request.file_content)
+        await asyncio.to_thread(os.replace, request.docx_path, path_docx)
         log_print(f"INFO: Saved new DOCX file: {path_docx}")
     except Exception as e:
         raise Exception(f"Gagal menyimpan file upload: {e}")
@@ -774,24 +1713,46 @@ async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any
     #     raise Exception("File DOCX corrupt atau tidak valid. Silakan periksa file dan coba lagi.")
     log_print("INFO: Skipping DOCX validation (temporary)")
 
-    # Check engine availability first
-    engines = check_conversion_engines()
+    return work_dir, path_docx, path_pdf
+
+
+async def _convert_stage(
+    request: ConversionRequest,
+    prepared: Optional[Tuple[str, str, str]] = None,
+    lo_success: bool = False,
+) -> Dict[str, Any]:
+    """Tahap konversi: simpan DOCX dan hasilkan PDF di direktori kerja request.
+
+    prepared/lo_success diisi oleh jalur batch: file kerja sudah disiapkan dan
+    (jika lo_success) PDF sudah dihasilkan oleh invocation soffice bersama,
+    sehingga tahap ini tinggal verifikasi atau fallback per-item.
+    """
+    if prepared is None:
+        work_dir, path_docx, path_pdf = await _prepare_work_files(request)
+    else:
+        work_dir, path_docx, path_pdf = prepared
+
+    # Check engine availability first (hasil cache; probe subprocess/COM mahal)
+    engines = get_cached_engines()
     log_print(f"INFO: Available conversion engines: {engines}")
-    
+
     # Konversi DOCX -> PDF: coba LibreOffice dulu, jika gagal baru fallback ke MS Word (docx2pdf) pada Windows/macOS
     conversion_timeout = int(os.getenv("CONVERSION_TIMEOUT", "90"))
-    log_print(f"INFO: Starting DOCX to PDF conversion (timeout {conversion_timeout}s). First try LibreOffice...")
 
     loop = asyncio.get_event_loop()
-    conversion_success = False
+    conversion_success = lo_success
     fallback_used = False
-    
-    # Try LibreOffice first if available
-    if engines["libreoffice"]:
-        lo_success = await loop.run_in_executor(None, convert_with_libreoffice, path_docx, path_pdf, conversion_timeout)
-        conversion_success = lo_success
-        
-        if lo_success:
+
+    # Try LibreOffice first if available (skip jika backend dipaksa ke docx2pdf
+    # atau jika batch LibreOffice sudah menghasilkan PDF-nya)
+    if conversion_success:
+        log_print("INFO: PDF already produced by batched LibreOffice conversion")
+    elif engines["libreoffice"] and CONVERTER_BACKEND != "docx2pdf":
+        log_print(f"INFO: Starting DOCX to PDF conversion (timeout {conversion_timeout}s). First try LibreOffice...")
+        lo_ok = await convert_with_libreoffice(path_docx, path_pdf, conversion_timeout)
+        conversion_success = lo_ok
+
+        if lo_ok:
             log_print("INFO: LibreOffice conversion successful")
         else:
             log_print("WARNING: LibreOffice conversion failed, will try fallback", "WARNING")
@@ -799,31 +1760,39 @@ async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any
         log_print("WARNING: LibreOffice not available, skipping to fallback", "WARNING")
 
     # Try MS Word fallback if LibreOffice failed and MS Word is available
-    if not conversion_success and engines["ms_word"]:
+    # (skip jika backend dipaksa LibreOffice-only)
+    if not conversion_success and engines["ms_word"] and CONVERTER_BACKEND != "libreoffice":
         log_print("INFO: Trying fallback via MS Word/Automator (docx2pdf)...")
         try:
-            conversion_success = await loop.run_in_executor(
-                None, convert_with_timeout, path_docx, path_pdf, conversion_timeout
+            # Submit langsung ke process pool + wait_for: tidak ada thread
+            # perantara yang cuma blocking menunggu future.result()
+            conversion_success, child_notes = await asyncio.wait_for(
+                loop.run_in_executor(get_convert_process_pool(), _convert_worker, path_docx, path_pdf),
+                timeout=conversion_timeout,
             )
+            # Diagnosa child di-log di sini supaya tetap masuk file log parent
+            for note_level, note_msg in child_notes:
+                log_print(f"{note_level}: {note_msg}", note_level)
             fallback_used = True
             if conversion_success:
                 log_print("INFO: MS Word fallback conversion successful")
             else:
                 log_print("ERROR: MS Word fallback conversion failed", "ERROR")
+        except asyncio.TimeoutError:
+            log_print(f"ERROR: Conversion timeout after {conversion_timeout} seconds - likely MS Word hang", "ERROR")
+            # Child yang hang di COM tidak bisa di-cancel; kill + rebuild pool
+            _rebuild_convert_pool()
         except Exception as e:
             log_print(f"ERROR: MS Word fallback failed with exception: {e}", "ERROR")
     elif not conversion_success:
         log_print("ERROR: No conversion engines available or all failed", "ERROR")
 
     if not conversion_success:
-        # Cleanup files jika konversi gagal
-        try:
-            if os.path.exists(path_docx):
-                os.remove(path_docx)
-            if os.path.exists(path_pdf):
-                os.remove(path_pdf)
-        except Exception:
-            pass
+        # Cleanup direktori kerja request jika konversi gagal
+        await asyncio.to_thread(shutil.rmtree, work_dir, ignore_errors=True)
+        # Cache engine bisa basi (mis. LibreOffice baru di-uninstall/di-kill);
+        # buang supaya konversi berikutnya probe ulang, bukan gagal beruntun
+        invalidate_engine_cache()
         # Provide more specific error messages based on what was tried
         error_parts = []
         if engines["libreoffice"]:
@@ -848,56 +1817,74 @@ async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any
             
         raise Exception(error_msg)
 
-    if not os.path.exists(path_pdf):
+    # Satu stat untuk cek keberadaan + ukuran; hasilnya dipakai sampai upload
+    try:
+        file_size = (await asyncio.to_thread(os.stat, path_pdf)).st_size
+    except FileNotFoundError:
         raise Exception("File PDF tidak ditemukan setelah konversi")
-    
-    # Check file size
-    file_size = os.path.getsize(path_pdf)
+
     max_size = 5 * 1024 * 1024  # 5MB limit
     if file_size > max_size:
         log_print(f"WARNING: PDF file size {file_size} bytes exceeds recommended limit", "WARNING")
     
     log_print(f"INFO: PDF created successfully - Size: {file_size} bytes, Path: {path_pdf}")
 
-    # Tentukan endpoint berdasarkan tipe
-    if request.endpoint_type == "convertDua":
-        post_url = f"{request.target_url.rstrip('/')}/check/responseBalikConvertDua"
-        max_retries = 3
-    else:
-        post_url = f"{request.target_url.rstrip('/')}/check/responseBalikConvert"
-        max_retries = 3
-    
+    return {"work_dir": work_dir, "path_docx": path_docx, "path_pdf": path_pdf, "file_size": file_size}
+
+
+async def _upload_stage(
+    request: ConversionRequest, work_dir: str, path_docx: str, path_pdf: str, file_size: int
+) -> Dict[str, Any]:
+    """Tahap upload: kirim PDF hasil konversi ke target server, lalu cleanup."""
+    # Konfigurasi per endpoint dari satu tabel (lihat ENDPOINT_CONFIG)
+    cfg = ENDPOINT_CONFIG.get(request.endpoint_type, ENDPOINT_CONFIG["convert"])
+    post_url = f"{request.target_url.rstrip('/')}{cfg['suffix']}"
+    max_retries = cfg["max_retries"]
+
+
+    # Fail fast saat breaker target terbuka: jangan tahan worker 60-90 detik
+    # untuk target yang sedang down
+    if not TARGET_BREAKER.allow(request.target_url):
+        raise Exception(f"Target {request.target_url} sedang down (circuit breaker open) - retry later")
+
     # Kirim ke target server
     retry_delay = 1
     resp = None
-    
+
+    client = get_target_client(request.target_url)
+    timeout_config = cfg["timeout"]
+
+    # Add data parameter to force overwrite existing files
+    data = {"overwrite": "true", "force_replace": "1"}
+    mp_headers, mp_body = _build_multipart_upload(path_pdf, file_size, data)
+    headers = {"User-Agent": "FastAPI-DOCX-Converter/1.0", **mp_headers}
+
     for attempt in range(max_retries + 1):
         try:
-            timeout_config = httpx.Timeout(90.0, connect=15.0) if request.endpoint_type == "convertDua" else httpx.Timeout(60.0, connect=10.0)
-            
-            async with httpx.AsyncClient(timeout=timeout_config) as client:
-                with open(path_pdf, "rb") as fpdf:
-                    file_size = os.path.getsize(path_pdf)
-                    log_print(f"DEBUG: Attempt {attempt + 1}/{max_retries + 1} - Uploading PDF size: {file_size} bytes to {post_url}", "DEBUG")
-                    
-                    files = {"docupload": (os.path.basename(path_pdf), fpdf, "application/pdf")}
-                    headers = {"User-Agent": "FastAPI-DOCX-Converter/1.0"}
-                    # Add data parameter to force overwrite existing files
-                    data = {"overwrite": "true", "force_replace": "1"}
-                    log_print(f"DEBUG: Sending overwrite parameters: {data}", "DEBUG")
-                    log_print(f"DEBUG: Uploading file: {os.path.basename(path_pdf)}", "DEBUG")
-                    resp = await client.post(post_url, files=files, headers=headers, data=data)
-                    
-                    # Jika sukses atau bukan server error, keluar dari retry loop
-                    if resp.status_code < 500:
-                        break
-                        
-        except (httpx.HTTPError, httpx.TimeoutException) as e:
+            if DEBUG_LOG_ENABLED:
+                log_print(f"DEBUG: Attempt {attempt + 1}/{max_retries + 1} - Uploading PDF size: {file_size} bytes to {post_url}", "DEBUG")
+                log_print(f"DEBUG: Sending overwrite parameters: {data}", "DEBUG")
+                log_print(f"DEBUG: Uploading file: {os.path.basename(path_pdf)}", "DEBUG")
+            resp = await client.post(post_url, content=mp_body(), headers=headers, timeout=timeout_config)
+
+            TARGET_BREAKER.record(request.target_url, resp.status_code < 500)
+
+            # Jika sukses atau bukan server error, keluar dari retry loop
+            if resp.status_code < 500:
+                break
+
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            TARGET_BREAKER.record(request.target_url, False)
+            # Hanya error level transport (koneksi/timeout) yang layak di-retry;
+            # koneksi keep-alive di shared client tetap dipakai ulang antar attempt
             log_print(f"DEBUG: Attempt {attempt + 1} failed with error: {e}", "DEBUG")
             if attempt < max_retries:
-                log_print(f"DEBUG: Retrying in {retry_delay} seconds...", "DEBUG")
-                await asyncio.sleep(retry_delay)
-                retry_delay *= 2
+                # Jitter supaya worker-worker tidak retry serempak ke target
+                # yang sama (retry amplification)
+                sleep_for = min(30.0, retry_delay * (0.5 + random.random()))
+                log_print(f"DEBUG: Retrying in {sleep_for:.1f} seconds...", "DEBUG")
+                await asyncio.sleep(sleep_for)
+                retry_delay = min(30, retry_delay * 2)
                 continue
             else:
                 raise Exception(f"Gagal upload ke target setelah {max_retries + 1} percobaan: {e}")
@@ -905,36 +1892,29 @@ async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any
     if resp is None:
         raise Exception("Tidak ada response dari target server")
     
-    log_print(f"DEBUG: Target response status: {resp.status_code}", "DEBUG")
-    log_print(f"DEBUG: Target response headers: {dict(resp.headers)}", "DEBUG")
-    
     resp_text = resp.text
     try:
         resp_json = resp.json()
     except Exception:
         resp_json = None
-        
-    log_print(f"DEBUG: Target response text: {resp_text[:500]}", "DEBUG")
-    log_print(f"DEBUG: Full target response: {resp_text}", "DEBUG")
-    
-    # Log file info yang dikirim
-    log_print(f"DEBUG: Sent filename: {os.path.basename(path_pdf)}", "DEBUG")
-    log_print(f"DEBUG: Local file exists: {os.path.exists(path_pdf)}", "DEBUG")
-    log_print(f"DEBUG: Local file size: {os.path.getsize(path_pdf) if os.path.exists(path_pdf) else 'N/A'}", "DEBUG")
+
+    if DEBUG_LOG_ENABLED:
+        log_print(f"DEBUG: Target response status: {resp.status_code}", "DEBUG")
+        log_print(f"DEBUG: Target response headers: {dict(resp.headers)}", "DEBUG")
+        log_print(f"DEBUG: Target response text: {resp_text[:500]}", "DEBUG")
+        log_print(f"DEBUG: Full target response: {resp_text}", "DEBUG")
+
+        # Log file info yang dikirim
+        log_print(f"DEBUG: Sent filename: {os.path.basename(path_pdf)}", "DEBUG")
+        log_print(f"DEBUG: Local file exists: {os.path.exists(path_pdf)}", "DEBUG")
+        log_print(f"DEBUG: Local file size: {os.path.getsize(path_pdf) if os.path.exists(path_pdf) else 'N/A'}", "DEBUG")
 
     # Cleanup files setelah upload sukses
     files_cleaned = False
     try:
         if 200 <= resp.status_code < 300 and resp_json and "upload_data" in resp_json:
-            # Delete local files after successful upload
-            if os.path.exists(path_docx):
-                os.remove(path_docx)
-                log_print(f"INFO: Deleted local DOCX file: {path_docx}")
-            
-            if os.path.exists(path_pdf):
-                os.remove(path_pdf)
-                log_print(f"INFO: Deleted local PDF file: {path_pdf}")
-                
+            # Hapus direktori kerja request (DOCX + PDF sekaligus) setelah upload sukses
+            await asyncio.to_thread(shutil.rmtree, work_dir, ignore_errors=True)
             files_cleaned = True
             log_print("INFO: Local files cleaned up successfully")
         else:
@@ -956,16 +1936,68 @@ async def process_single_conversion(request: ConversionRequest) -> Dict[str, Any
 @app.on_event("startup")
 async def startup_event():
     """Start queue workers saat aplikasi dimulai"""
+    # Eager task factory (Python 3.12+): task yang selesai tanpa suspend
+    # (update status dict, future yang sudah ready) tidak lewat scheduler
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        log_print("INFO: Using asyncio eager task factory")
+
+    # Warm cache engine di background supaya konversi pertama tidak bayar probe
+    asyncio.create_task(asyncio.to_thread(get_cached_engines))
+    # Pool profile LibreOffice reusable, di-seed dari template warm; jalan di
+    # thread karena first-run template bisa beberapa detik
+    asyncio.create_task(asyncio.to_thread(_init_lo_profile_pool))
     for i in range(MAX_CONCURRENT_WORKERS):
         asyncio.create_task(process_conversion_queue(i + 1))
-    log_print(f"INFO: Started {MAX_CONCURRENT_WORKERS} conversion queue workers")
+    for i in range(UPLOAD_WORKERS):
+        asyncio.create_task(process_upload_queue(i + 1))
+    asyncio.create_task(_evict_stale_status())
+    asyncio.create_task(_evict_stale_work_dirs())
+    log_print(f"INFO: Started {MAX_CONCURRENT_WORKERS} conversion and {UPLOAD_WORKERS} upload queue workers")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Tutup client HTTP per-target saat aplikasi berhenti"""
+    for client in TARGET_CLIENTS.values():
+        await client.aclose()
+    TARGET_CLIENTS.clear()
+
+    # Stop listener logging: flush sisa record di queue sebelum process exit
+    stop_log_listener()
+
+
+# Cache hasil probe engine untuk /health: probe subprocess/COM mahal,
+# sementara liveness probe bisa dipanggil tiap detik
+_ENGINES_CACHE: Optional[Dict[str, bool]] = None
+_ENGINES_CACHE_TS = 0.0
+ENGINES_CACHE_TTL = 300  # detik
+
+
+def invalidate_engine_cache():
+    """Reset memo soffice + cache engine (dipanggil setelah cleanup proses hang,
+    karena kondisi engine bisa berubah setelah proses dimatikan)."""
+    global _SOFFICE_PROBED, _SOFFICE_PATH, _ENGINES_CACHE
+    _SOFFICE_PROBED = False
+    _SOFFICE_PATH = None
+    _ENGINES_CACHE = None
+
+
+def get_cached_engines() -> Dict[str, bool]:
+    """Hasil check_conversion_engines() dengan TTL, untuk jalur yang sering dipanggil."""
+    global _ENGINES_CACHE, _ENGINES_CACHE_TS
+    now = time.monotonic()
+    if _ENGINES_CACHE is None or (now - _ENGINES_CACHE_TS) > ENGINES_CACHE_TTL:
+        _ENGINES_CACHE = check_conversion_engines()
+        _ENGINES_CACHE_TS = now
+    return _ENGINES_CACHE
 
 
 @app.get("/health")
 def health() -> dict:
     """Enhanced health check with conversion engine status."""
     try:
-        engines = check_conversion_engines()
+        engines = get_cached_engines()
         queue_size = conversion_queue.qsize()
         
         return {
@@ -975,7 +2007,8 @@ def health() -> dict:
             "workers_running": queue_workers_running,
             "max_workers": MAX_CONCURRENT_WORKERS,
             "queue_size": queue_size,
-            "psutil_available": PSUTIL_AVAILABLE
+            "psutil_available": PSUTIL_AVAILABLE,
+            "target_breakers": TARGET_BREAKER.state()
         }
     except Exception as e:
         log_print(f"ERROR: Health check failed: {e}", "ERROR")
@@ -990,45 +2023,72 @@ def health() -> dict:
         }
 
 
+def tail_log(n_bytes: int = 1 << 20, name: str = "converter.log") -> bytes:
+    """Baca maksimal n_bytes terakhir dari file log (O(1) terhadap ukuran log)."""
+    path = os.path.join(LOG_DIR, name)
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - n_bytes))
+        return f.read()
+
+
+@app.get("/logs/tail")
+def get_log_tail(n_bytes: int = 1 << 20, errors: bool = False):
+    """Tail log file utama (atau error log dengan errors=true)."""
+    name = "converter_errors.log" if errors else "converter.log"
+    try:
+        data = tail_log(min(n_bytes, 1 << 20), name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Log file {name} belum ada")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gagal membaca log: {e}")
+    return {"file": name, "bytes": len(data), "data": data.decode(errors="ignore")}
+
+
 @app.get("/queue/status")
 def get_queue_status():
     """Endpoint untuk melihat status queue"""
     try:
         queue_size = conversion_queue.qsize()
-        
-        # Hitung status berdasarkan kategori
-        status_counts = {"queued": 0, "processing": 0, "completed": 0, "upload_failed": 0, "error": 0}
+
+        # Counter di-maintain inkremental per transisi; ring berisi 20 request terbaru
+        counts = {
+            status: status_counts.get(status, 0)
+            for status in ("queued", "processing", "uploading", "completed", "upload_failed", "error")
+        }
+
         recent_requests = []
-        
-        for req_id, status_info in queue_status.items():
+        for req_id in list(recent_request_ids):
+            status_info = queue_status.get(req_id)
+            if status_info is None:
+                continue
             try:
-                status_counts[status_info["status"]] += 1
                 recent_requests.append({
                     "request_id": req_id,
                     "nomor_urut": status_info.get("nomor_urut", "unknown"),
                     "status": status_info["status"],
-                    "created_at": status_info["created_at"].isoformat() if status_info.get("created_at") else None,
-                    "started_at": status_info.get("started_at").isoformat() if status_info.get("started_at") else None,
-                    "completed_at": status_info.get("completed_at").isoformat() if status_info.get("completed_at") else None,
+                    # datetime diserialisasi native oleh orjson; tidak perlu isoformat()
+                    "created_at": status_info.get("created_at"),
+                    "started_at": status_info.get("started_at"),
+                    "completed_at": status_info.get("completed_at"),
                     "error": status_info.get("error")
                 })
             except Exception as e:
                 log_print(f"WARNING: Error processing queue status for {req_id}: {e}", "WARNING")
                 continue
-        
-        # Urutkan berdasarkan waktu pembuatan (terbaru dulu)
-        try:
-            recent_requests.sort(key=lambda x: x["created_at"] or "", reverse=True)
-        except Exception as e:
-            log_print(f"WARNING: Error sorting recent requests: {e}", "WARNING")
-        
+
         return {
             "status": "ok",
             "queue_size": queue_size,
+            "queue_depth_by_priority": {
+                "convert": queued_by_priority.get(0, 0),
+                "convertDua": queued_by_priority.get(1, 0),
+            },
             "workers_running": queue_workers_running,
             "max_concurrent_workers": MAX_CONCURRENT_WORKERS,
-            "status_counts": status_counts,
-            "recent_requests": recent_requests[:20]  # Tampilkan 20 request terakhir
+            "status_counts": counts,
+            "recent_requests": recent_requests  # 20 request terakhir (terbaru dulu)
         }
     except Exception as e:
         log_print(f"ERROR: Queue status endpoint failed: {e}", "ERROR")
@@ -1038,74 +2098,130 @@ def get_queue_status():
             "queue_size": 0,
             "workers_running": queue_workers_running,
             "max_concurrent_workers": MAX_CONCURRENT_WORKERS,
-            "status_counts": {"queued": 0, "processing": 0, "completed": 0, "upload_failed": 0, "error": 0},
+            "status_counts": {"queued": 0, "processing": 0, "uploading": 0, "completed": 0, "upload_failed": 0, "error": 0},
             "recent_requests": []
         }
 
 
-@app.post("/convert")
-async def convert_docx_to_pdf(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    nomor_urut: str = Form(...),
-    target_url: str = Form(...),
-):
+async def _enqueue_conversion(
+    file: UploadFile,
+    nomor_urut: str,
+    target_url: str,
+    endpoint_type: str,
+    parent_job: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Jalur enqueue bersama untuk /convert dan /convertDua."""
     # Validasi
     filename = file.filename or "uploaded.docx"
     if not filename.lower().endswith(".docx"):
         raise HTTPException(status_code=400, detail="File harus berformat .docx")
-    
-    # Baca file content
+
+    # Simpan upload ke file staging secara streaming (tidak menahan seluruh file
+    # di RAM); hash konten dihitung sambil jalan untuk dedup in-flight
+    staged_path = os.path.join(BASE_DIR, f"upload_{uuid.uuid4().hex}.docx")
+    hasher = hashlib.sha256()
     try:
-        file_content = await file.read()
+        async with aiofiles.open(staged_path, "wb") as f:
+            while chunk := await file.read(1 << 20):
+                hasher.update(chunk)
+                await f.write(chunk)
     except Exception as e:
+        try:
+            os.remove(staged_path)
+        except OSError:
+            pass
         raise HTTPException(status_code=500, detail=f"Gagal membaca file upload: {e}")
-    
+
+    # Dedup: konten + tujuan yang sama persis sedang diproses -> jangan
+    # konversi dua kali, arahkan caller ke request yang sudah berjalan
+    dedup_key = f"{hasher.hexdigest()}:{nomor_urut}:{endpoint_type}:{target_url.rstrip('/')}"
+    existing_id = INFLIGHT_HASHES.get(dedup_key)
+    if existing_id and queue_status.get(existing_id, {}).get("status") in ("queued", "processing", "uploading"):
+        try:
+            os.remove(staged_path)
+        except OSError:
+            pass
+        log_print(f"INFO: Duplicate upload for {nomor_urut} deduplicated to in-flight request {existing_id}")
+        return {
+            "status": "duplicate",
+            "request_id": existing_id,
+            "nomor_urut": nomor_urut,
+            "queue_position": conversion_queue.qsize(),
+            "message": "Konversi identik sedang berjalan. Gunakan /queue/status untuk melihat progress."
+        }
+
     # Validasi awal dinonaktifkan sementara sesuai permintaan
     # is_valid, validation_message = validate_docx_content(file_content)
     # if not is_valid:
     #     raise HTTPException(status_code=400, detail=f"File DOCX tidak valid: {validation_message}")
     # log_print(f"INFO: Initial file validation passed for {nomor_urut}: {validation_message}")
     log_print(f"INFO: Skipping initial DOCX validation for {nomor_urut} (temporary)")
-    
-    # Generate unique request ID
-    request_id = str(uuid.uuid4())
-    
+
+    # Generate unique request ID: token_hex lebih murah dari UUID (satu
+    # urandom + hex) dan 16 char lebih hemat sebagai key dict/status
+    request_id = secrets.token_hex(8)
+
     # Buat conversion request
     conversion_request = ConversionRequest(
         request_id=request_id,
-        file_content=file_content,
+        docx_path=staged_path,
         filename=filename,
         nomor_urut=nomor_urut,
         target_url=target_url,
-        endpoint_type="convert",
+        endpoint_type=endpoint_type,
         created_at=datetime.now()
     )
-    
+
     # Tambahkan ke queue status tracking
     queue_status[request_id] = {
         "status": "queued",
         "nomor_urut": nomor_urut,
         "filename": filename,
         "target_url": target_url,
-        "endpoint_type": "convert",
-        "created_at": conversion_request.created_at
+        "endpoint_type": endpoint_type,
+        "created_at": conversion_request.created_at,
+        "dedup_key": dedup_key
     }
-    
-    # Tambahkan ke queue
-    await conversion_queue.put(conversion_request)
-    
+    if parent_job:
+        queue_status[request_id]["parent_job"] = parent_job
+    INFLIGHT_HASHES[dedup_key] = request_id
+
+    # Tambahkan ke queue; penuh = beri sinyal jelas ke caller untuk retry
+    priority = _ENDPOINT_PRIORITY.get(endpoint_type, 1)
+    try:
+        conversion_queue.put_nowait((priority, next(_QUEUE_SEQ), conversion_request))
+        queued_by_priority[priority] += 1
+    except asyncio.QueueFull:
+        queue_status.pop(request_id, None)
+        if INFLIGHT_HASHES.get(dedup_key) == request_id:
+            INFLIGHT_HASHES.pop(dedup_key, None)
+        try:
+            os.remove(staged_path)
+        except OSError:
+            pass
+        raise HTTPException(status_code=503, detail="Antrian konversi penuh, coba lagi nanti")
+
+    _register_status(request_id)
+
     log_print(f"INFO: Added conversion request {request_id} to queue for {nomor_urut}")
-    
-    return JSONResponse(
-        content={
-            "status": "queued",
-            "request_id": request_id,
-            "nomor_urut": nomor_urut,
-            "queue_position": conversion_queue.qsize(),
-            "message": "Request telah ditambahkan ke antrian. Gunakan /queue/status untuk melihat progress."
-        }
-    )
+
+    return {
+        "status": "queued",
+        "request_id": request_id,
+        "nomor_urut": nomor_urut,
+        "queue_position": conversion_queue.qsize(),
+        "message": "Request telah ditambahkan ke antrian. Gunakan /queue/status untuk melihat progress."
+    }
+
+
+@app.post("/convert")
+async def convert_docx_to_pdf(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    nomor_urut: str = Form(...),
+    target_url: str = Form(...),
+):
+    return await _enqueue_conversion(file, nomor_urut, target_url, "convert")
 
 
 @app.post("/convertDua")
@@ -1115,59 +2231,116 @@ async def convert_docx_to_pdf_dua(
     nomor_urut: str = Form(...),
     target_url: str = Form(...),
 ):
-    # Validasi
-    filename = file.filename or "uploaded.docx"
-    if not filename.lower().endswith(".docx"):
-        raise HTTPException(status_code=400, detail="File harus berformat .docx")
-    
-    # Baca file content
-    try:
-        file_content = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gagal membaca file upload: {e}")
-    
-    # Validasi awal dinonaktifkan sementara sesuai permintaan
-    # is_valid, validation_message = validate_docx_content(file_content)
-    # if not is_valid:
-    #     raise HTTPException(status_code=400, detail=f"File DOCX tidak valid: {validation_message}")
-    # log_print(f"INFO: Initial file validation passed for {nomor_urut}: {validation_message}")
-    log_print(f"INFO: Skipping initial DOCX validation for {nomor_urut} (temporary)")
-    
-    # Generate unique request ID
-    request_id = str(uuid.uuid4())
-    
-    # Buat conversion request
-    conversion_request = ConversionRequest(
-        request_id=request_id,
-        file_content=file_content,
-        filename=filename,
-        nomor_urut=nomor_urut,
-        target_url=target_url,
-        endpoint_type="convertDua",
-        created_at=datetime.now()
-    )
-    
-    # Tambahkan ke queue status tracking
-    queue_status[request_id] = {
+    return await _enqueue_conversion(file, nomor_urut, target_url, "convertDua")
+
+
+@app.post("/convertBatch")
+async def convert_docx_to_pdf_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    nomor_urut: str = Form(...),
+    target_url: str = Form(...),
+    endpoint_type: str = Form("convert"),
+):
+    """Enqueue beberapa file sekaligus sebagai satu job.
+
+    nomor_urut berisi daftar dipisah koma, satu per file (urutan sama dengan files).
+    Setiap file jadi satu entry antrian sendiri sehingga tersebar ke semua worker;
+    progress gabungan bisa dilihat via /queue/status/{job_id}.
+    """
+    nomor_list = [n.strip() for n in nomor_urut.split(",") if n.strip()]
+    if len(nomor_list) != len(files):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Jumlah nomor_urut ({len(nomor_list)}) tidak sama dengan jumlah file ({len(files)})"
+        )
+    if endpoint_type not in ("convert", "convertDua"):
+        raise HTTPException(status_code=400, detail="endpoint_type harus convert atau convertDua")
+
+    job_id = secrets.token_hex(8)
+    children = []
+    failed_detail = None
+    for file, nomor in zip(files, nomor_list):
+        try:
+            result = await _enqueue_conversion(file, nomor, target_url, endpoint_type, parent_job=job_id)
+        except HTTPException as e:
+            # Antrian penuh di tengah batch: anak yang sudah masuk tetap
+            # diproses, jadi kembalikan job parsial agar caller tetap bisa
+            # tracking (bukan 503 tanpa jejak)
+            if not children:
+                raise
+            failed_detail = f"{nomor}: {e.detail}"
+            break
+        children.append(result["request_id"])
+    _register_batch_job(job_id, children)
+
+    if failed_detail is not None:
+        log_print(
+            f"WARNING: Batch job {job_id} partially enqueued ({len(children)}/{len(files)}): {failed_detail}",
+            "WARNING",
+        )
+        return {
+            "status": "partial",
+            "job_id": job_id,
+            "request_ids": children,
+            "enqueued": len(children),
+            "total": len(files),
+            "detail": f"Antrian penuh setelah {len(children)} file: {failed_detail}",
+            "message": "Sebagian file masuk antrian. Kirim ulang sisa file nanti; gunakan /queue/status/{job_id} untuk progress."
+        }
+
+    log_print(f"INFO: Added batch job {job_id} with {len(children)} conversion requests")
+
+    return {
         "status": "queued",
-        "nomor_urut": nomor_urut,
-        "filename": filename,
-        "target_url": target_url,
-        "endpoint_type": "convertDua",
-        "created_at": conversion_request.created_at
+        "job_id": job_id,
+        "request_ids": children,
+        "queue_position": conversion_queue.qsize(),
+        "message": "Batch telah ditambahkan ke antrian. Gunakan /queue/status/{job_id} untuk melihat progress."
+    }
+
+
+@app.get("/queue/status/{job_id}")
+def get_job_status(job_id: str):
+    """Status agregat untuk satu batch job (atau satu request_id tunggal)."""
+    child_ids = batch_jobs.get(job_id)
+    if child_ids is None:
+        # Bukan batch job: coba sebagai request_id tunggal
+        status_info = queue_status.get(job_id)
+        if status_info is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} tidak ditemukan")
+        child_ids = [job_id]
+
+    children = []
+    counts: Counter = Counter()
+    for req_id in child_ids:
+        status_info = queue_status.get(req_id)
+        status = status_info["status"] if status_info else "evicted"
+        counts[status] += 1
+        children.append({
+            "request_id": req_id,
+            "nomor_urut": status_info.get("nomor_urut", "unknown") if status_info else "unknown",
+            "status": status,
+            "error": status_info.get("error") if status_info else None,
+        })
+
+    total = len(child_ids)
+    finished = counts["completed"] + counts["upload_failed"] + counts["error"] + counts["evicted"]
+    if counts["error"] or counts["upload_failed"]:
+        overall = "error" if finished == total else "processing"
+    elif finished == total:
+        overall = "completed"
+    elif counts["processing"] or counts["uploading"] or counts["completed"]:
+        overall = "processing"
+    else:
+        overall = "queued"
+
+    return {
+        "status": "ok",
+        "job_id": job_id,
+        "overall_status": overall,
+        "total": total,
+        "finished": finished,
+        "status_counts": dict(counts),
+        "requests": children,
     }
-    
-    # Tambahkan ke queue
-    await conversion_queue.put(conversion_request)
-    
-    log_print(f"INFO: Added conversion request {request_id} to queue for {nomor_urut}")
-    
-    return JSONResponse(
-        content={
-            "status": "queued",
-            "request_id": request_id,
-            "nomor_urut": nomor_urut,
-            "queue_position": conversion_queue.qsize(),
-            "message": "Request telah ditambahkan ke antrian. Gunakan /queue/status untuk melihat progress."
-        }
-    )
@@ -1,7 +1,9 @@
+import mmap
 import os
 import shutil
 import subprocess
 import tempfile
+import uuid
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Form
 from fastapi.responses import StreamingResponse, JSONResponse
 import httpx
@@ -45,11 +47,12 @@ async def convert_docx_to_pdf(
     except ValueError:
         convert_timeout = 120
 
-    # Simpan upload langsung ke folder tujuan (meniru PHP)
+    # Simpan upload langsung ke folder tujuan (meniru PHP), streaming per 1MB
+    # supaya file besar tidak menginap utuh di RAM
     try:
         with open(path_docx, "wb") as f:
-            content = await file.read()
-            f.write(content)
+            while chunk := await file.read(1 << 20):
+                f.write(chunk)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Gagal menyimpan file upload: {e}")
 
@@ -60,7 +63,12 @@ async def convert_docx_to_pdf(
     except Exception:
         pass
 
-    # Konversi via LibreOffice (soffice) dengan outdir ke folder tujuan
+    # Konversi via LibreOffice (soffice) dengan outdir unik per request:
+    # tidak perlu scan listdir/getmtime di folder produksi untuk menemukan
+    # hasilnya, dan dua konversi paralel tidak bisa saling ambil PDF
+    outdir = os.path.join(fullpath, f".tmp_{nomor_urut}_{uuid.uuid4().hex}")
+    os.makedirs(outdir, exist_ok=True)
+
     cmd = [
         "soffice",
         "--headless",
@@ -71,7 +79,7 @@ async def convert_docx_to_pdf(
         "--convert-to",
         "pdf",
         "--outdir",
-        fullpath,
+        outdir,
         path_docx,
     ]
 
@@ -85,6 +93,7 @@ async def convert_docx_to_pdf(
             env={**os.environ, "HOME": "/tmp"},
         )
     except FileNotFoundError:
+        shutil.rmtree(outdir, ignore_errors=True)
         raise HTTPException(
             status_code=500,
             detail=(
@@ -92,6 +101,7 @@ async def convert_docx_to_pdf(
             ),
         )
     except subprocess.TimeoutExpired:
+        shutil.rmtree(outdir, ignore_errors=True)
         raise HTTPException(
             status_code=504,
             detail=(
@@ -101,34 +111,61 @@ async def convert_docx_to_pdf(
         )
 
     if proc.returncode != 0:
+        shutil.rmtree(outdir, ignore_errors=True)
         raise HTTPException(
             status_code=500,
             detail=f"Gagal konversi. stderr: {proc.stderr.strip()} | stdout: {proc.stdout.strip()}",
         )
 
-    if not os.path.exists(path_pdf):
-        # Fallback: cari *.pdf dengan prefix nomor_urut jika dinamai berbeda
-        candidates = [p for p in os.listdir(fullpath) if p.lower().endswith(".pdf")]
-        if candidates:
-            # Pilih yang paling baru
-            newest = max(
-                (os.path.join(fullpath, p) for p in candidates),
-                key=lambda p: os.path.getmtime(p),
-            )
-            path_pdf = newest
-        else:
-            raise HTTPException(status_code=500, detail="File PDF tidak ditemukan setelah konversi")
+    # Ambil hasil dari outdir unik (isinya paling banyak satu PDF), lalu
+    # pindahkan ke path final
+    produced = [p for p in os.listdir(outdir) if p.lower().endswith(".pdf")]
+    if not produced:
+        shutil.rmtree(outdir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail="File PDF tidak ditemukan setelah konversi")
+    os.replace(os.path.join(outdir, produced[0]), path_pdf)
+    shutil.rmtree(outdir, ignore_errors=True)
 
     # Kirim PDF ke target_url seperti PHP
     target_url = (target_url or "").rstrip("/")
     endpoint_suffix = os.getenv("TARGET_ENDPOINT_SUFFIX", "/check/responseBalikConvert")
     post_url = f"{target_url}{endpoint_suffix}"
 
+    # Body multipart dialirkan per 64KB lewat mmap: PDF besar tidak pernah
+    # utuh di RAM dan tidak ada copy bytes perantara di userspace
+    boundary = uuid.uuid4().hex
+    preamble = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="docupload"; filename="{os.path.basename(path_pdf)}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    trailer = f"\r\n--{boundary}--\r\n".encode()
+    pdf_size = os.path.getsize(path_pdf)
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(preamble) + pdf_size + len(trailer)),
+    }
+
+    async def body():
+        yield preamble
+        if pdf_size > 0:
+            with open(path_pdf, "rb") as fpdf:
+                try:
+                    # Slicing mmap menghasilkan bytes; jangan yield memoryview
+                    # karena chunk terakhir masih dipegang consumer saat mmap
+                    # di-close (BufferError: exported pointers exist)
+                    with mmap.mmap(fpdf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        for offset in range(0, pdf_size, 64 * 1024):
+                            yield mm[offset:offset + 64 * 1024]
+                except (ValueError, OSError):
+                    # Fallback read biasa (mis. filesystem tanpa dukungan mmap)
+                    while chunk := fpdf.read(64 * 1024):
+                        yield chunk
+        yield trailer
+
     try:
         async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
-            with open(path_pdf, "rb") as fpdf:
-                files = {"docupload": (os.path.basename(path_pdf), fpdf, "application/pdf")}
-                resp = await client.post(post_url, files=files)
+            resp = await client.post(post_url, content=body(), headers=headers)
         resp_text = resp.text
         # Coba parse JSON
         try: